@@ -0,0 +1,580 @@
+"""
+Pre-aggregated views of the review table that the dashboard tabs read from.
+
+Every chart only ever needs sums of thumbsUpCount_222 over some combination of
+day, App, appVersion and kmeans_cluster_name, so the raw rows are collapsed
+once per data load into a daily cube and all tabs are answered from that.
+"""
+import copy
+
+import numpy as np
+import pandas as pd
+
+import profiling
+
+CUBE_KEYS = ['at', 'App', 'appVersion', 'kmeans_cluster_name']
+
+
+def build_daily_cube(df):
+    """
+    Collapse review rows into one row per (day, App, appVersion, kmeans_cluster_name).
+    - 'at' is floored to midnight, so it stays a datetime column
+    - thumbsUpCount_222 holds the sum over the reviews in that cell
+    - n_reviews holds how many reviews fell into that cell; rows that already carry
+      an n_reviews count (a cube file, see build_cube.py) add up their counts
+    - day holds 'at' as an integer day number (days since 1970-01-01), computed
+      once here so the date index and time bucketing never convert timestamps again
+    The cube keeps the column names of the raw table, so any chart function
+    can be given the cube instead of the raw rows and produce the same figure.
+    """
+    # Counts may be stored in a narrow dtype; sum in 64 bits so cells cannot overflow
+    values = df['thumbsUpCount_222']
+    values = values.astype(np.int64 if pd.api.types.is_integer_dtype(values) else np.float64)
+
+    group_keys = [df['at'].dt.floor('D'), df['App'], df['appVersion'], df['kmeans_cluster_name']]
+    if 'n_reviews' in df.columns:
+        counts = pd.DataFrame({'thumbsUpCount_222': values, 'n_reviews': df['n_reviews'].astype(np.int64)})
+        cube = counts.groupby(group_keys, dropna=False, observed=True, sort=False).sum().reset_index()
+    else:
+        cube = values.groupby(group_keys, dropna=False, observed=True, sort=False).agg(['sum', 'size'])
+        cube = cube.rename(columns={'sum': 'thumbsUpCount_222', 'size': 'n_reviews'}).reset_index()
+    return with_day_numbers(cube.sort_values('at', kind='stable', ignore_index=True))
+
+
+def with_day_numbers(cube):
+    """
+    `cube` with the integer 'day' column of build_daily_cube added.
+    """
+    return cube.assign(day=_to_day_numbers(cube['at']).astype(np.int32))
+
+
+def merge_daily_cubes(cube, delta_cube):
+    """
+    Daily cube of `cube` plus `delta_cube`, both as returned by build_daily_cube.
+    Cells before the first day in the delta are kept as they are; only the
+    days from there on are re-aggregated, so appending new days costs about
+    the size of the delta. `cube` may be in any row order; the result is in no
+    particular order.
+    """
+    cube, delta_cube = concat_aligned([cube, delta_cube], split=True)
+    # A mask rather than a binary search, so `cube` does not have to be in day order
+    later = (cube['at'] >= delta_cube['at'].min()).to_numpy()
+    touched = concat_aligned([cube[later], delta_cube])
+    touched = touched.groupby(CUBE_KEYS + ['day'], dropna=False, observed=True, sort=False)[
+        ['thumbsUpCount_222', 'n_reviews']
+    ].sum().reset_index()
+    return concat_aligned([cube[~later], touched])
+
+
+def combine_daily_cubes(cubes):
+    """
+    Daily cube of the reviews behind all of `cubes` (as returned by
+    build_daily_cube), which may cover the same days in any order, e.g. the
+    partial cubes of chunks of a review file.
+    """
+    combined = concat_aligned(cubes).groupby(CUBE_KEYS + ['day'], dropna=False, observed=True, sort=False)[
+        ['thumbsUpCount_222', 'n_reviews']
+    ].sum().reset_index()
+    return combined.sort_values('at', kind='stable', ignore_index=True)
+
+
+def concat_aligned(frames, split=False):
+    """
+    pd.concat for frames whose categorical columns may have different categories:
+    categories are unioned (and kept sorted) first, so the result stays categorical.
+    With split=True the aligned frames are returned instead of being concatenated.
+    """
+    frames = list(frames)
+    for column in frames[0].columns:
+        if not all(isinstance(frame[column].dtype, pd.CategoricalDtype) for frame in frames):
+            continue
+        categories = sorted(set().union(*(frame[column].cat.categories for frame in frames)))
+        frames = [
+            frame if list(frame[column].cat.categories) == categories
+            else frame.assign(**{column: frame[column].cat.set_categories(categories)})
+            for frame in frames
+        ]
+    if split:
+        return frames
+    return pd.concat(frames, ignore_index=True)
+
+
+def held_nbytes(array):
+    """
+    Bytes of `array` held in this process's own memory: 0 for an array (or a view
+    of one) memory-mapped from a file, whose pages every process mapping the file shares.
+    """
+    base = array
+    while isinstance(base, np.ndarray):
+        if isinstance(base, np.memmap):
+            return 0
+        base = base.base
+    return array.nbytes
+
+
+class AppPartitions:
+    """
+    The daily cube in (App, kmeans_cluster_name) order (rows_by_app), with the
+    row range of every App and App x cluster pair. A cube not yet in that order
+    is reordered once, keeping the order of rows inside each group; a cube
+    already in it is used as is, so the partitions are views into it.
+    Selecting an App is a dictionary lookup plus a slice of contiguous rows
+    (no scan, no copy), so it costs the same for 10 Apps or 500.
+    Cubes added with with_layer() get partitions of their own, see there.
+    """
+
+    def __init__(self, cube):
+        app_codes, apps = pd.factorize(cube['App'], sort=True)
+        cluster_codes, clusters = pd.factorize(cube['kmeans_cluster_name'], sort=True)
+        stride = len(clusters) + 1
+        # Monotonic in (App, cluster); rows with a missing key sort in front and are never selected
+        keys = app_codes.astype(np.int64) * stride + (cluster_codes.astype(np.int64) + 1)
+        if len(keys) and (np.diff(keys) < 0).any():
+            order = np.argsort(keys, kind='stable')
+            self.rows_by_app = cube.take(order).reset_index(drop=True)
+            self._keys = keys[order]
+        else:
+            # Already in App order (e.g. the cube of a LoadedDataset): use it as is
+            self.rows_by_app = cube
+            self._keys = keys
+        self._stride = stride
+        self._app_codes = {app: code for code, app in enumerate(apps)}
+        self._cluster_codes = {cluster: code for code, cluster in enumerate(clusters)}
+        self._layers = ()
+
+    @property
+    def nbytes(self):
+        """
+        Bytes of the partition keys and of every layer (rows_by_app itself not included).
+        """
+        return self._keys.nbytes + sum(layer.nbytes + int(layer.rows_by_app.memory_usage(deep=True).sum())
+                                       for layer in self._layers)
+
+    def with_layer(self, cube):
+        """
+        New AppPartitions that also holds the cells of `cube` (e.g. the daily
+        cube of a delta batch). They are partitioned on their own instead of
+        being merged in, so adding them costs about their own size; rows()
+        joins the rows of every layer. A cell present in several layers is
+        returned once per layer, which sums to the same totals.
+        This AppPartitions is left unchanged.
+        """
+        new = copy.copy(self)
+        new._layers = self._layers + (AppPartitions(cube),)
+        return new
+
+    def rows(self, app, clusters=None):
+        """
+        Cube rows of `app`, optionally only those in the given clusters.
+        For a whole App the result is a slice of the reordered cube; with
+        `clusters` (or layers) it joins one slice per cluster (and layer).
+        """
+        rows = self._own_rows(app, clusters)
+        if not self._layers:
+            return rows
+        parts = [part for part in [rows] + [layer.rows(app, clusters) for layer in self._layers] if len(part)]
+        if len(parts) <= 1:
+            return parts[0] if parts else rows
+        return concat_aligned(parts)
+
+    def _own_rows(self, app, clusters):
+        code = self._app_codes.get(app)
+        if code is None:
+            return self.rows_by_app.iloc[:0]
+        if clusters is None:
+            start, stop = np.searchsorted(self._keys, [code * self._stride, (code + 1) * self._stride])
+            return self.rows_by_app.iloc[start:stop]
+
+        first_key = code * self._stride + 1
+        cluster_keys = sorted({first_key + self._cluster_codes[c] for c in clusters if c in self._cluster_codes})
+        bounds = np.searchsorted(self._keys, [k + offset for k in cluster_keys for offset in (0, 1)])
+        slices = [self.rows_by_app.iloc[start:stop] for start, stop in zip(bounds[::2], bounds[1::2])]
+        if not slices:
+            return self.rows_by_app.iloc[:0]
+        return slices[0] if len(slices) == 1 else pd.concat(slices)
+
+
+TIME_BUCKETS = ('day', 'week', 'month')
+
+
+@profiling.timed('aggregate')
+def time_bucket_sums(df, buckets=TIME_BUCKETS, value='thumbsUpCount_222', by='kmeans_cluster_name'):
+    """
+    `value` summed per (time bucket, `by`) for each of `buckets`, in one pass over `df`.
+    Rows are binned once into integer day numbers (the cube's precomputed 'day'
+    column when present); week and month sums are then derived from the
+    day x `by` matrix instead of from the rows again.
+    `df` is neither modified nor copied.
+    Returns {bucket: DataFrame with columns ['at', by, value]}:
+    - 'at' is the start of the bucket (weeks start on Monday)
+    - like groupby([bucket, by]).sum(), only pairs with at least one row are
+      listed, ordered by bucket then `by`, and rows missing either key are ignored
+    """
+    timestamps = df['at']
+    if isinstance(df[by].dtype, pd.CategoricalDtype):
+        codes, labels = df[by].cat.codes.to_numpy(), df[by].cat.categories
+    else:
+        codes, labels = pd.factorize(df[by], sort=True)
+    present = timestamps.notna().to_numpy() & (codes >= 0)
+    days = _day_numbers_of(df)[present]
+    codes = np.asarray(codes[present], dtype=np.int64)
+    weights = np.nan_to_num(df[value].to_numpy(dtype=np.float64, na_value=np.nan)[present])
+    integer = pd.api.types.is_integer_dtype(df[value])
+
+    if not len(days):
+        empty = pd.DataFrame({'at': pd.Series(dtype='datetime64[ns]'), by: [], value: []})
+        return {bucket: empty for bucket in buckets}
+
+    first_day = int(days.min())
+    n_days = int(days.max()) - first_day + 1
+    n_labels = len(labels)
+    flat = (days - first_day) * n_labels + codes
+    daily_sums = np.bincount(flat, weights=weights, minlength=n_days * n_labels).reshape(n_days, n_labels)
+    daily_rows = np.bincount(flat, minlength=n_days * n_labels).reshape(n_days, n_labels)
+
+    day_starts = np.arange(first_day, first_day + n_days).astype('datetime64[D]')
+    result = {}
+    for bucket in buckets:
+        if bucket == 'day':
+            starts, sums, rows = day_starts, daily_sums, daily_rows
+        else:
+            if bucket == 'week':
+                # Day 0 (1970-01-01) is a Thursday, so Monday-based weeks are (day + 3) // 7
+                bucket_ids = (np.arange(first_day, first_day + n_days) + 3) // 7
+                bucket_starts = (bucket_ids * 7 - 3).astype('datetime64[D]')
+            elif bucket == 'month':
+                bucket_ids = day_starts.astype('datetime64[M]').astype(np.int64)
+                bucket_starts = day_starts.astype('datetime64[M]').astype('datetime64[D]')
+            else:
+                raise ValueError(f"unknown time bucket {bucket!r}, expected one of {TIME_BUCKETS}")
+            # Bucket ids only grow with the day, so each bucket is one run of daily rows
+            boundaries = np.flatnonzero(np.diff(bucket_ids)) + 1
+            boundaries = np.concatenate([[0], boundaries])
+            starts = bucket_starts[boundaries]
+            sums = np.add.reduceat(daily_sums, boundaries, axis=0)
+            rows = np.add.reduceat(daily_rows, boundaries, axis=0)
+
+        bucket_index, label_index = np.nonzero(rows)
+        bucket_values = sums[bucket_index, label_index]
+        result[bucket] = pd.DataFrame({
+            'at': starts[bucket_index].astype('datetime64[ns]'),
+            by: labels[label_index],
+            value: bucket_values.astype(np.int64) if integer else bucket_values,
+        })
+    return result
+
+
+# Prefix rows of the most recent days that each DateRangeIndex keeps in a tail of its
+# own; the tail is moved into a shared block once it grows past TAIL_MAX_ROWS
+TAIL_ROWS = 8
+TAIL_MAX_ROWS = 40
+
+
+class DateRangeIndex:
+    """
+    Cumulative daily sums per (App, kmeans_cluster_name), built from the daily cube.
+    - cum_sums[d, p]: thumbsUpCount_222 summed over days before day d for pair p
+    - cum_counts[d, p]: number of reviews over the same days
+    Row 0 is all zeros, so the total for days [s, e] is cum[e + 1] - cum[s]:
+    any date-range App x cluster table costs two row lookups and a subtraction.
+
+    The rows are stored as read-only blocks, shared with every index extended
+    from this one, plus a small tail holding the last few rows, which only this
+    index uses. extended() copies and updates just the rows from the first day a
+    delta touches, so an index is never modified once built.
+    """
+
+    def __init__(self, cube):
+        cube = cube.dropna(subset=['App', 'kmeans_cluster_name'])
+        days = _day_numbers_of(cube)
+
+        # Sorted codes; for categorical columns this reuses the existing integer codes
+        app_codes, apps = pd.factorize(cube['App'], sort=True)
+        cluster_codes, clusters = pd.factorize(cube['kmeans_cluster_name'], sort=True)
+        self.apps = list(apps)
+        self.clusters = list(clusters)
+
+        # Only (App, cluster) pairs that actually occur get a column
+        pair_keys = _pair_keys(app_codes, cluster_codes, len(self.clusters))
+        unique_pairs, pair_codes = np.unique(pair_keys, return_inverse=True)
+        self._set_pairs(unique_pairs)
+
+        self.first_day = int(days.min()) if len(days) else 0
+        self.n_days = int(days.max()) - self.first_day + 1 if len(days) else 0
+        integer = pd.api.types.is_integer_dtype(cube['thumbsUpCount_222'])
+        sums, counts = self._zeros(self.n_days + 1, np.int64 if integer else np.float64)
+        _add_prefix_sums(sums, counts, 0, days - self.first_day, pair_codes, cube)
+        self._store(sums, counts)
+
+    @classmethod
+    def from_arrays(cls, cum_sums, cum_counts, apps, clusters, pair_app_codes, pair_cluster_codes, first_day):
+        """
+        Index over prefix-sum arrays built elsewhere, e.g. memory-mapped from a
+        shared store. The arrays are used as they are, without copying.
+        """
+        index = object.__new__(cls)
+        index.apps = list(apps)
+        index.clusters = list(clusters)
+        index.pair_app_codes = np.asarray(pair_app_codes)
+        index.pair_cluster_codes = np.asarray(pair_cluster_codes)
+        index.first_day = int(first_day)
+        index.n_days = len(cum_sums) - 1
+        index._blocks = [(0, cum_sums, cum_counts)]
+        index._split = len(cum_sums)
+        index._tail_sums = cum_sums[len(cum_sums):]
+        index._tail_counts = cum_counts[len(cum_counts):]
+        return index
+
+    def extended(self, delta_cube):
+        """
+        New index covering this one plus `delta_cube` (a daily cube of new reviews).
+        When the delta has no new (App, cluster) pairs and no day before the first
+        one, the blocks before its first day are shared and only the rows from
+        there on are copied and updated: about (days from the delta's first day to
+        the last) x pairs of work, e.g. a few rows for a batch of recent reviews.
+        Otherwise the whole index is rebuilt. This index itself is left unchanged.
+        """
+        delta = delta_cube.dropna(subset=['App', 'kmeans_cluster_name'])
+        if delta.empty:
+            return self
+        days = _day_numbers_of(delta)
+
+        apps = sorted(set(self.apps).union(delta['App'].unique()))
+        clusters = sorted(set(self.clusters).union(delta['kmeans_cluster_name'].unique()))
+        old_app_codes = _recode(self.apps, apps)[self.pair_app_codes]
+        old_cluster_codes = _recode(self.clusters, clusters)[self.pair_cluster_codes]
+        old_keys = _pair_keys(old_app_codes, old_cluster_codes, len(clusters))
+        delta_keys = _pair_keys(
+            pd.Categorical(delta['App'], categories=apps).codes,
+            pd.Categorical(delta['kmeans_cluster_name'], categories=clusters).codes,
+            len(clusters),
+        )
+        unique_pairs = np.union1d(old_keys, delta_keys)
+
+        first_day = min(self.first_day, int(days.min())) if self.n_days else int(days.min())
+        last_day = max(self.first_day + self.n_days - 1, int(days.max())) if self.n_days else int(days.max())
+        integer = pd.api.types.is_integer_dtype(delta['thumbsUpCount_222'])
+        dtype = self._dtype() if integer else np.float64
+
+        new = object.__new__(DateRangeIndex)
+        new.apps = apps
+        new.clusters = clusters
+        new._set_pairs(unique_pairs)
+        new.first_day = first_day
+        new.n_days = last_day - first_day + 1
+        day_offsets = days - first_day
+        pair_codes = np.searchsorted(unique_pairs, delta_keys)
+
+        if len(unique_pairs) == len(old_keys) and first_day == self.first_day and dtype == self._dtype():
+            # Rows up to the delta's first day are unchanged: share them, copy the rest
+            split = min(self._split, int(day_offsets.min()) + 1)
+            new._blocks = [(start, sums[:split - start], counts[:split - start])
+                           for start, sums, counts in self._blocks if start < split]
+            # Rows past this index's last day start from its last row
+            rows = np.minimum(np.arange(split, new.n_days + 1), self.n_days)
+            sums, counts = self.sums_at(rows), self.counts_at(rows)
+            _add_prefix_sums(sums, counts, split, day_offsets, pair_codes, delta)
+            new._split = split
+            new._tail_sums, new._tail_counts = sums, counts
+            if len(sums) > TAIL_MAX_ROWS:
+                new._move_to_blocks(len(sums) - TAIL_ROWS)
+            return new
+
+        sums, counts = new._zeros(new.n_days + 1, dtype)
+        columns = np.searchsorted(unique_pairs, old_keys)
+        offset = self.first_day - first_day
+        sums[offset:offset + self.n_days + 1, columns] = self.cum_sums
+        counts[offset:offset + self.n_days + 1, columns] = self.cum_counts
+        sums[offset + self.n_days + 1:, columns] = self.sums_at(self.n_days)
+        counts[offset + self.n_days + 1:, columns] = self.counts_at(self.n_days)
+        _add_prefix_sums(sums, counts, 0, day_offsets, pair_codes, delta)
+        new._store(sums, counts)
+        return new
+
+    @property
+    def cum_sums(self):
+        """
+        All prefix rows of thumbsUpCount_222 sums, as one array. It is assembled from
+        the stored blocks when there are several; sums_at() reads just a few rows.
+        """
+        return self._assemble(1)
+
+    @property
+    def cum_counts(self):
+        """
+        All prefix rows of review counts, as one array (see cum_sums).
+        """
+        return self._assemble(2)
+
+    @property
+    def nbytes(self):
+        """
+        Bytes of the stored prefix rows held in memory (shared blocks included,
+        memory-mapped ones left out, see held_nbytes).
+        """
+        pieces = self._blocks + [(self._split, self._tail_sums, self._tail_counts)]
+        return sum(held_nbytes(sums) + held_nbytes(counts) for _, sums, counts in pieces)
+
+    def sums_at(self, rows):
+        """
+        cum_sums[rows] for a row number or an array of them, without assembling cum_sums.
+        """
+        return self._rows_at(rows, 1)
+
+    def counts_at(self, rows):
+        """
+        cum_counts[rows] for a row number or an array of them, without assembling cum_counts.
+        """
+        return self._rows_at(rows, 2)
+
+    def sum_columns(self, positions):
+        """
+        cum_sums[:, positions]: every prefix row of the pairs at `positions`.
+        """
+        pieces = self._pieces(1)
+        return np.concatenate([array[:, positions] for _, array in pieces])[:self.n_days + 1]
+
+    def _set_pairs(self, unique_pairs):
+        n_clusters = max(len(self.clusters), 1)
+        self.pair_app_codes = unique_pairs // n_clusters
+        self.pair_cluster_codes = unique_pairs % n_clusters
+
+    def _zeros(self, n_rows, dtype):
+        n_pairs = len(self.pair_app_codes)
+        return np.zeros((n_rows, n_pairs), dtype=dtype), np.zeros((n_rows, n_pairs), dtype=np.int64)
+
+    def _store(self, sums, counts):
+        # All rows but the last TAIL_ROWS go into one shared block
+        self._blocks = []
+        self._split = 0
+        self._tail_sums, self._tail_counts = sums, counts
+        self._move_to_blocks(max(len(sums) - TAIL_ROWS, 0))
+
+    def _move_to_blocks(self, n_rows):
+        if n_rows <= 0:
+            return
+        self._blocks = self._blocks + [(self._split, self._tail_sums[:n_rows], self._tail_counts[:n_rows])]
+        self._split += n_rows
+        self._tail_sums = self._tail_sums[n_rows:]
+        self._tail_counts = self._tail_counts[n_rows:]
+
+    def _pieces(self, which):
+        # (first row, array) of each stored piece; which is 1 for sums, 2 for counts
+        pieces = [(piece[0], piece[which]) for piece in self._blocks]
+        tail = self._tail_sums if which == 1 else self._tail_counts
+        return [piece for piece in pieces if len(piece[1])] + ([(self._split, tail)] if len(tail) else [])
+
+    def _assemble(self, which):
+        pieces = self._pieces(which)
+        if len(pieces) == 1:
+            return pieces[0][1][:self.n_days + 1]
+        return np.concatenate([array for _, array in pieces])
+
+    def _rows_at(self, rows, which):
+        rows = np.asarray(rows, dtype=np.int64)
+        pieces = self._pieces(which)
+        if len(pieces) == 1:
+            return pieces[0][1][rows]
+        flat = rows.reshape(-1)
+        result = np.empty((len(flat), len(self.pair_app_codes)), dtype=pieces[0][1].dtype)
+        for start, array in pieces:
+            inside = (flat >= start) & (flat < start + len(array))
+            result[inside] = array[flat[inside] - start]
+        return result.reshape(rows.shape + (len(self.pair_app_codes),))
+
+    def _dtype(self):
+        return self._pieces(1)[0][1].dtype
+
+    def day_offset(self, value):
+        """
+        Row of `value` (a date, datetime or Timestamp) in the daily arrays, 0 for first_day;
+        may fall outside [0, n_days) for dates outside the index.
+        """
+        return _day_number(value) - self.first_day
+
+    @profiling.timed('aggregate')
+    def query(self, start_date, end_date, apps=None, clusters=None):
+        """
+        App x kmeans_cluster_name table of thumbsUpCount_222 sums for [start_date, end_date].
+        - start_date / end_date: inclusive bounds (date, datetime or Timestamp)
+        - apps / clusters: optional lists restricting the rows / columns
+        Like a pivot of the filtered rows, only Apps and clusters with at least one
+        review in the range appear; cells without reviews are 0.
+        """
+        first = self.day_offset(start_date)
+        last = self.day_offset(end_date)
+        first = min(max(first, 0), self.n_days)
+        last = min(max(last, -1), self.n_days - 1)
+        if last < first:
+            sums = np.zeros(len(self.pair_app_codes), dtype=self._dtype())
+            counts = np.zeros(len(self.pair_app_codes), dtype=np.int64)
+        else:
+            sums = np.diff(self.sums_at([first, last + 1]), axis=0)[0]
+            counts = np.diff(self.counts_at([first, last + 1]), axis=0)[0]
+
+        keep = counts > 0
+        if apps is not None:
+            keep &= np.isin(self.pair_app_codes, _codes_of(apps, self.apps))
+        if clusters is not None:
+            keep &= np.isin(self.pair_cluster_codes, _codes_of(clusters, self.clusters))
+
+        app_codes = self.pair_app_codes[keep]
+        cluster_codes = self.pair_cluster_codes[keep]
+        row_codes = np.unique(app_codes)
+        col_codes = np.unique(cluster_codes)
+
+        table = np.zeros((len(row_codes), len(col_codes)), dtype=sums.dtype)
+        table[np.searchsorted(row_codes, app_codes), np.searchsorted(col_codes, cluster_codes)] = sums[keep]
+        return pd.DataFrame(
+            table,
+            index=pd.Index([self.apps[c] for c in row_codes], name='App'),
+            columns=pd.Index([self.clusters[c] for c in col_codes], name='kmeans_cluster_name'),
+        )
+
+
+def _add_prefix_sums(sums, counts, first_row, day_offsets, pair_codes, cube):
+    """
+    Add the cube rows (at day offsets / pair columns) to every prefix row they
+    affect, in `sums` / `counts` holding the rows from `first_row` on.
+    """
+    if not len(day_offsets):
+        return
+    n_pairs = sums.shape[1]
+    first, last = int(day_offsets.min()), int(day_offsets.max())
+    span = last - first + 1
+    flat = (day_offsets - first) * n_pairs + pair_codes
+    for target, values in ((sums, cube['thumbsUpCount_222']), (counts, cube['n_reviews'])):
+        daily = np.bincount(flat, weights=values.to_numpy(dtype=np.float64), minlength=span * n_pairs)
+        running = np.cumsum(daily.reshape(span, n_pairs), axis=0).astype(target.dtype)
+        target[first + 1 - first_row:last + 2 - first_row] += running
+        target[last + 2 - first_row:] += running[-1]
+
+
+def _pair_keys(app_codes, cluster_codes, n_clusters):
+    return np.asarray(app_codes, dtype=np.int64) * n_clusters + np.asarray(cluster_codes, dtype=np.int64)
+
+
+def _recode(old_vocabulary, new_vocabulary):
+    positions = {value: code for code, value in enumerate(new_vocabulary)}
+    return np.array([positions[value] for value in old_vocabulary], dtype=np.int64)
+
+
+def _day_numbers_of(df):
+    if 'day' in df:
+        return df['day'].to_numpy(dtype=np.int64)
+    return _to_day_numbers(df['at'])
+
+
+def _to_day_numbers(timestamps):
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_localize(None)
+    return timestamps.to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+def _day_number(value):
+    return int(np.datetime64(pd.Timestamp(value).date(), 'D').astype(np.int64))
+
+
+def _codes_of(values, vocabulary):
+    positions = {value: code for code, value in enumerate(vocabulary)}
+    return np.array([positions[v] for v in values if v in positions], dtype=np.int64)
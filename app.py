@@ -1,27 +1,52 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import datetime
 
-def create_summation_heatmap(df):
+import profiling
+from aggregates import TIME_BUCKETS, time_bucket_sums
+from figure_cache import get_figure_cache
+from figure_jobs import chart_slot, fill_slots, once
+from pivots import PivotMatrix
+from profiling import process_rss_bytes
+from shared_store import serving_dataset
+from trends import RANKINGS, SHORT_WINDOW, pair_trends, rolling_sums, top_movers
+from versions import LEVELS, bucket_versions, version_labels
+
+# Heatmaps with more cells than this drop the per-cell text labels (hover still
+# shows every value); the text is most of the figure JSON for big matrices.
+HEATMAP_TEXT_MAX_CELLS = 2000
+
+# appVersion heatmaps with more rows than this show an overview of the largest
+# rows plus an "Other" row; individual rows are reachable through drill-down.
+HEATMAP_MAX_ROWS = 60
+
+
+@profiling.timed('figure')
+def create_heatmap(table, hovertemplate, texttemplate=None, labels=None, width=3200, height=900,
+                   color_scale="OrRd", midpoint=None):
     """
-    Create a heatmap with summation of 'thumbsUpCount_222'.
-    Each cell shows the total thumbsUpCount_222 for that App x kmeans_cluster_name.
+    Shared px.imshow setup for every heatmap in the dashboard.
+    - z is sent as a compact binary typed array (int32 for counts, float32 for %)
+    - per-cell text only while the table has at most HEATMAP_TEXT_MAX_CELLS cells
+    - midpoint centres a diverging color_scale, e.g. on 0 for deltas
     """
-    pivot_data = df.groupby(['App', 'kmeans_cluster_name'])['thumbsUpCount_222'].sum().reset_index()
-    pivot_table = pivot_data.pivot(
-        index='App',
-        columns='kmeans_cluster_name',
-        values='thumbsUpCount_222'
-    ).fillna(0)
+    values = table.to_numpy()
+    if np.issubdtype(values.dtype, np.integer) and (values.size == 0 or np.abs(values).max() < 2 ** 31):
+        z = values.astype(np.int32)
+    else:
+        z = values.astype(np.float32)
+    show_text = z.size <= HEATMAP_TEXT_MAX_CELLS
 
     fig = px.imshow(
-        pivot_table,
-        labels=dict(x="", y="", color=""),
-        x=pivot_table.columns,
-        y=pivot_table.index,
-        color_continuous_scale="OrRd",
-        text_auto=True,
+        z,
+        labels=labels or dict(x="", y="", color=""),
+        x=[str(c) for c in table.columns],
+        y=[str(i) for i in table.index],
+        color_continuous_scale=color_scale,
+        color_continuous_midpoint=midpoint,
+        text_auto=show_text,
         aspect="auto"
     )
 
@@ -29,20 +54,46 @@ def create_summation_heatmap(df):
     fig.update_yaxes(tickfont=dict(size=14))
     fig.update_layout(
         autosize=False,
-        width=3200,
-        height=900,  # default height
+        width=width,
+        height=height,
         margin=dict(l=60, r=60, t=80, b=50),
-        xaxis_title=None,
-        yaxis_title=None,
+        xaxis_title=None if labels is None else labels['x'],
+        yaxis_title=None if labels is None else labels['y'],
         coloraxis_showscale=False
     )
-    fig.update_traces(
+    fig.update_traces(hovertemplate=hovertemplate, textfont_size=12)
+    if show_text and texttemplate:
+        fig.update_traces(texttemplate=texttemplate)
+    return fig
+
+
+def get_summation_table(df):
+    """
+    App x kmeans_cluster_name table of summed 'thumbsUpCount_222'.
+    Returns the DataFrame (NOT a figure).
+    """
+    return PivotMatrix.from_frame(df).raw()
+
+
+def create_summation_heatmap(df):
+    """
+    Create a heatmap with summation of 'thumbsUpCount_222'.
+    Each cell shows the total thumbsUpCount_222 for that App x kmeans_cluster_name.
+    """
+    return create_summation_heatmap_from_table(get_summation_table(df))
+
+
+def create_summation_heatmap_from_table(pivot_table):
+    """
+    Same heatmap as create_summation_heatmap, drawn from an already summed
+    App x kmeans_cluster_name table (e.g. a DateRangeIndex query).
+    """
+    return create_heatmap(
+        pivot_table,
         hovertemplate="<b>App:</b> %{y}<br>"
                       "<b>kmeans_cluster_name:</b> %{x}<br>"
-                      "<b>Sum thumbsUpCount_222:</b> %{z}",
-        textfont_size=12
+                      "<b>Sum thumbsUpCount_222:</b> %{z}"
     )
-    return fig
 
 
 def create_percentage_heatmap(df):
@@ -50,45 +101,23 @@ def create_percentage_heatmap(df):
     Create a heatmap with row-wise percentages of 'thumbsUpCount_222'.
     Each row sums to 100%.
     """
-    pivot_data = df.groupby(['App', 'kmeans_cluster_name'])['thumbsUpCount_222'].sum().reset_index()
-    pivot_table = pivot_data.pivot(
-        index='App',
-        columns='kmeans_cluster_name',
-        values='thumbsUpCount_222'
-    ).fillna(0)
+    return create_percentage_heatmap_from_table(get_summation_table(df))
 
-    row_sums = pivot_table.sum(axis=1)
-    percentage_table = pivot_table.div(row_sums, axis=0) * 100
 
-    fig = px.imshow(
-        percentage_table,
-        labels=dict(x="", y="", color=""),
-        x=percentage_table.columns,
-        y=percentage_table.index,
-        color_continuous_scale="OrRd",
-        text_auto=True,
-        aspect="auto"
-    )
+def create_percentage_heatmap_from_table(pivot_table):
+    """
+    Same heatmap as create_percentage_heatmap, drawn from an already summed
+    App x kmeans_cluster_name table.
+    """
+    percentage_table = PivotMatrix.from_table(pivot_table).row_pct()
 
-    fig.update_xaxes(tickangle=45, tickfont=dict(size=14))
-    fig.update_yaxes(tickfont=dict(size=14))
-    fig.update_layout(
-        autosize=False,
-        width=3200,
-        height=900,  # default height
-        margin=dict(l=60, r=60, t=80, b=50),
-        xaxis_title=None,
-        yaxis_title=None,
-        coloraxis_showscale=False
-    )
-    fig.update_traces(
+    return create_heatmap(
+        percentage_table,
         hovertemplate="<b>App:</b> %{y}<br>"
                       "<b>kmeans_cluster_name:</b> %{x}<br>"
                       "<b>% of thumbsUpCount_222 in row:</b> %{z:.2f}%",
-        texttemplate="%{z:.1f}",
-        textfont_size=12
+        texttemplate="%{z:.1f}"
     )
-    return fig
 
 
 def get_intra_app_swot_table(df):
@@ -98,54 +127,20 @@ def get_intra_app_swot_table(df):
        => Each column sums to 100%.
     Returns the final DataFrame (NOT a figure).
     """
-    pivot_data = df.groupby(['App', 'kmeans_cluster_name'])['thumbsUpCount_222'].sum().reset_index()
-    pivot_table = pivot_data.pivot(
-        index='App',
-        columns='kmeans_cluster_name',
-        values='thumbsUpCount_222'
-    ).fillna(0)
-
-    row_sums = pivot_table.sum(axis=1)
-    row_wise_pct_table = pivot_table.div(row_sums, axis=0) * 100
-
-    col_sums = row_wise_pct_table.sum(axis=0)
-    col_wise_pct_table = row_wise_pct_table.div(col_sums, axis=1) * 100
-
-    return col_wise_pct_table
+    return PivotMatrix.from_frame(df).swot()
 
 
 def create_intra_app_swot_heatmap(df_table):
     """
     Each column sums to 100%.
     """
-    fig = px.imshow(
+    return create_heatmap(
         df_table,
-        labels=dict(x="", y="", color=""),
-        x=df_table.columns,
-        y=df_table.index,
-        color_continuous_scale="OrRd",
-        text_auto=True,
-        aspect="auto"
-    )
-
-    fig.update_xaxes(tickangle=45, tickfont=dict(size=14))
-    fig.update_yaxes(tickfont=dict(size=14))
-
-    fig.update_layout(
-        autosize=False,
-        width=3200,
-        height=900,
-        margin=dict(l=60, r=60, t=80, b=50),
-        coloraxis_showscale=False
-    )
-    fig.update_traces(
         hovertemplate="<b>App:</b> %{y}<br>"
                       "<b>kmeans_cluster_name:</b> %{x}<br>"
                       "<b>Column % (SWOT):</b> %{z:.2f}%",
-        texttemplate="%{z:.1f}",
-        textfont_size=12
+        texttemplate="%{z:.1f}"
     )
-    return fig
 
 
 def create_inter_app_strength_heatmap(df_table):
@@ -153,62 +148,107 @@ def create_inter_app_strength_heatmap(df_table):
     Takes the final table from Intra-App SWOT (column-wise %)
     and converts it to a row-wise % table => each row sums to 100%.
     """
-    row_sums = df_table.sum(axis=1)
-    row_wise_again = df_table.div(row_sums, axis=0) * 100
+    row_wise_again = PivotMatrix.from_table(df_table).row_pct()
 
-    fig = px.imshow(
+    return create_heatmap(
         row_wise_again,
-        labels=dict(x="", y="", color=""),
-        x=row_wise_again.columns,
-        y=row_wise_again.index,
-        color_continuous_scale="OrRd",
-        text_auto=True,
-        aspect="auto"
+        hovertemplate="<b>App:</b> %{y}<br>"
+                      "<b>kmeans_cluster_name:</b> %{x}<br>"
+                      "<b>Row % (Inter-App):</b> %{z:.2f}%",
+        texttemplate="%{z:.1f}"
     )
 
-    fig.update_xaxes(tickangle=45, tickfont=dict(size=14))
-    fig.update_yaxes(tickfont=dict(size=14))
 
-    fig.update_layout(
-        autosize=False,
-        width=3200,
-        height=900,
-        margin=dict(l=60, r=60, t=80, b=50),
-        coloraxis_showscale=False
-    )
-    fig.update_traces(
+# Per PivotMatrix view: title and hover label of the Tab 8 period comparison heatmaps
+DELTA_VIEWS = {
+    'raw': ("Summation", "Change in sum thumbsUpCount_222"),
+    'row_pct': ("Row-wise %", "Change in row % (pp)"),
+    'swot': ("Inter-App SWOT", "Change in column % (pp)"),
+    'strength': ("Intra-App Strength", "Change in row % (pp)"),
+}
+
+
+def create_delta_heatmap(delta_table, view):
+    """
+    Diverging heatmap of a PivotMatrix.delta() table (period B minus period A),
+    centred on 0: red where B is higher, blue where it is lower.
+    None if neither period has reviews.
+    """
+    if delta_table.empty:
+        return None
+    hover_label = DELTA_VIEWS[view][1]
+    value_format = "%{z:,}" if view == 'raw' else "%{z:+.2f}"
+    return create_heatmap(
+        delta_table,
         hovertemplate="<b>App:</b> %{y}<br>"
                       "<b>kmeans_cluster_name:</b> %{x}<br>"
-                      "<b>Row % (Inter-App):</b> %{z:.2f}%",
-        texttemplate="%{z:.1f}",
-        textfont_size=12
+                      f"<b>{hover_label}:</b> {value_format}",
+        texttemplate=None if view == 'raw' else "%{z:+.1f}",
+        color_scale="RdBu_r",
+        midpoint=0,
     )
-    return fig
+
+
+# Per time bucket: chart title, axis label and x tick format of the Tab 5 scatter plots
+TIME_SCATTER_STYLES = {
+    'month': ("Monthly", "Month", "%Y-%m"),
+    'week': ("Weekly", "Week", None),
+    'day': ("Daily", "Day", None),
+}
 
 
 def create_monthly_scatter_plot(df):
     """
-    - Convert 'at' to monthly period
-    - Group by (month_year, kmeans_cluster_name) summing thumbsUpCount_222
+    - Sum thumbsUpCount_222 per (month, kmeans_cluster_name)
     - Circle size = sum(thumbsUpCount_222)
     - Legend at the bottom
     """
+    return create_time_scatter_plot(df, 'month')
+
+
+def create_weekly_scatter_plot(df):
+    """
+    Same as create_monthly_scatter_plot, per week (starting on Monday).
+    """
+    return create_time_scatter_plot(df, 'week')
+
+
+def create_daily_scatter_plot(df):
+    """
+    Same as create_monthly_scatter_plot, per day.
+    """
+    return create_time_scatter_plot(df, 'day')
+
+
+def create_time_scatter_plot(df, bucket):
+    """
+    Scatter plot of thumbsUpCount_222 per (`bucket`, kmeans_cluster_name) for
+    the rows in `df` (not modified). None if `df` is empty.
+    """
     if df.empty:
         return None
+    return create_time_scatter_plot_from_series(time_bucket_sums(df, buckets=(bucket,))[bucket], bucket)
 
-    df['month_year'] = df['at'].dt.to_period("M").dt.to_timestamp()
-    grouped = df.groupby(['month_year', 'kmeans_cluster_name'])['thumbsUpCount_222'].sum().reset_index()
 
+@profiling.timed('figure')
+def create_time_scatter_plot_from_series(grouped, bucket):
+    """
+    Scatter plot from one series of time_bucket_sums (e.g. computed once for
+    all buckets). None if the series is empty.
+    """
+    if grouped.empty:
+        return None
+    title, axis_label, tickformat = TIME_SCATTER_STYLES[bucket]
     fig = px.scatter(
         grouped,
-        x='month_year',
+        x='at',
         y='thumbsUpCount_222',
         color='kmeans_cluster_name',
         size='thumbsUpCount_222',
         size_max=40,
-        title="Monthly Summation of ThumbsUpCount_222 by kmeans_cluster_name",
+        title=f"{title} Summation of ThumbsUpCount_222 by kmeans_cluster_name",
         labels={
-            'month_year': 'Month',
+            'at': axis_label,
             'thumbsUpCount_222': 'Sum Thumbs Up'
         },
         hover_data=['kmeans_cluster_name', 'thumbsUpCount_222'],
@@ -228,10 +268,10 @@ def create_monthly_scatter_plot(df):
         )
     )
     fig.update_xaxes(
-        tickformat="%Y-%m",
+        tickformat=tickformat,
         tickangle=45,
         tickfont=dict(size=12),
-        title_text="Month"
+        title_text=axis_label
     )
     fig.update_yaxes(
         title_text="Summation of ThumbsUpCount_222",
@@ -240,34 +280,30 @@ def create_monthly_scatter_plot(df):
     return fig
 
 
-def create_daily_scatter_plot(df):
+@profiling.timed('figure')
+def create_rolling_trend_plot(series, window, as_of=None):
     """
-    - Convert 'at' to day (just date)
-    - Group by (day, kmeans_cluster_name) summing thumbsUpCount_222
-    - Circle size = sum(thumbsUpCount_222)
-    - Legend at the bottom
+    Line chart of trailing `window`-day thumbsUpCount_222 sums, one line per
+    (App, kmeans_cluster_name) in `series` (see trends.rolling_sums), with a
+    marker line at `as_of`. None if `series` is empty.
     """
-    if df.empty:
+    if series.empty:
         return None
-
-    df['day'] = df['at'].dt.date
-    grouped = df.groupby(['day', 'kmeans_cluster_name'])['thumbsUpCount_222'].sum().reset_index()
-
-    fig = px.scatter(
-        grouped,
-        x='day',
+    series = series.assign(series=series['App'].astype(str) + " / " + series['kmeans_cluster_name'].astype(str))
+    fig = px.line(
+        series,
+        x='at',
         y='thumbsUpCount_222',
-        color='kmeans_cluster_name',
-        size='thumbsUpCount_222',
-        size_max=40,
-        title="Daily Summation of ThumbsUpCount_222 by kmeans_cluster_name",
+        color='series',
+        title=f"Rolling {window}-day Summation of ThumbsUpCount_222 for the Top Movers",
         labels={
-            'day': 'Day',
-            'thumbsUpCount_222': 'Sum Thumbs Up'
+            'at': 'Day',
+            'thumbsUpCount_222': f'Sum Thumbs Up ({window} days)',
+            'series': 'App / kmeans_cluster_name',
         },
-        hover_data=['kmeans_cluster_name', 'thumbsUpCount_222'],
     )
-
+    if as_of is not None:
+        fig.add_vline(x=pd.Timestamp(as_of), line_dash='dot', line_color='grey')
     fig.update_layout(
         autosize=False,
         width=1200,
@@ -281,125 +317,444 @@ def create_daily_scatter_plot(df):
             x=0.5
         )
     )
-    fig.update_xaxes(
-        tickangle=45,
-        tickfont=dict(size=12),
-        title_text="Day"
-    )
-    fig.update_yaxes(
-        title_text="Summation of ThumbsUpCount_222",
-        tickfont=dict(size=12)
-    )
     return fig
 
 
 # --------------------------------------------------------------------------------
-# Updated helper functions for Tab 6 with increased height
+# Helper functions for Tab 6
 # --------------------------------------------------------------------------------
-def create_appversion_summation_heatmap(df_app_filtered):
+def create_appversion_summation_heatmap(df_app_filtered, rows=None, level='version', top_k=None,
+                                        version_range=None):
     """
     Summation heatmap where rows = appVersion, columns = kmeans_cluster_name,
-    values = sum(thumbsUpCount_222).
+    values = sum(thumbsUpCount_222). Rows are in semantic version order.
+    - level: 'version', or 'minor' / 'major' to sum patch releases into x.y.x / x.x rows
+    - version_range: (low, high) labels of that level to limit the rows to
+    - rows=None shows the top_k largest rows plus an 'Other' row (top_k
+      defaults to HEATMAP_MAX_ROWS - 1); rows=(start, stop) drills down into
+      that slice of rows instead
     """
-    pivot_data = df_app_filtered.groupby(['appVersion', 'kmeans_cluster_name'])['thumbsUpCount_222'].sum().reset_index()
-    pivot_table = pivot_data.pivot(
-        index='appVersion',
-        columns='kmeans_cluster_name',
-        values='thumbsUpCount_222'
-    ).fillna(0)
+    pivot_table = _appversion_matrix(df_app_filtered, rows, level, top_k, version_range).raw()
 
-    fig = px.imshow(
+    return create_heatmap(
         pivot_table,
-        labels=dict(x="kmeans_cluster_name", y="appVersion", color=""),
-        x=pivot_table.columns,
-        y=pivot_table.index,
-        color_continuous_scale="OrRd",
-        text_auto=True,
-        aspect="auto"
-    )
-
-    fig.update_xaxes(tickangle=45, tickfont=dict(size=14))
-    fig.update_yaxes(tickfont=dict(size=14))
-
-    # Increase height to 1100 (or other desired value)
-    fig.update_layout(
-        autosize=False,
-        width=2200,
-        height=1100,  # <--- increased height
-        margin=dict(l=60, r=60, t=80, b=50),
-        coloraxis_showscale=False
-    )
-    fig.update_traces(
         hovertemplate="<b>appVersion:</b> %{y}<br>"
                       "<b>kmeans_cluster_name:</b> %{x}<br>"
                       "<b>Sum thumbsUpCount_222:</b> %{z}",
-        textfont_size=12
+        labels=dict(x="kmeans_cluster_name", y="appVersion", color=""),
+        width=2200,
+        height=1100
     )
-    return fig
 
 
-def create_appversion_percentage_heatmap(df_app_filtered):
+def create_appversion_percentage_heatmap(df_app_filtered, rows=None, level='version', top_k=None,
+                                         version_range=None):
     """
     Row-wise % heatmap for the top table in Tab 6.
     Rows = appVersion, columns = kmeans_cluster_name.
-    Each row sums to 100%.
+    Each row sums to 100%. The other arguments work as in create_appversion_summation_heatmap.
     """
-    pivot_data = df_app_filtered.groupby(['appVersion', 'kmeans_cluster_name'])['thumbsUpCount_222'].sum().reset_index()
-    pivot_table = pivot_data.pivot(
-        index='appVersion',
-        columns='kmeans_cluster_name',
-        values='thumbsUpCount_222'
-    ).fillna(0)
-
-    row_sums = pivot_table.sum(axis=1)
-    pct_table = pivot_table.div(row_sums, axis=0) * 100
+    pct_table = _appversion_matrix(df_app_filtered, rows, level, top_k, version_range).row_pct()
 
-    fig = px.imshow(
+    return create_heatmap(
         pct_table,
+        hovertemplate="<b>appVersion:</b> %{y}<br>"
+                      "<b>kmeans_cluster_name:</b> %{x}<br>"
+                      "<b>% of row:</b> %{z:.2f}%",
+        texttemplate="%{z:.1f}",
         labels=dict(x="kmeans_cluster_name", y="appVersion", color=""),
-        x=pct_table.columns,
-        y=pct_table.index,
-        color_continuous_scale="OrRd",
-        text_auto=True,
-        aspect="auto"
+        width=2200,
+        height=1100
     )
 
-    fig.update_xaxes(tickangle=45, tickfont=dict(size=14))
-    fig.update_yaxes(tickfont=dict(size=14))
 
-    # Increase height to 1100 (or other desired value)
-    fig.update_layout(
-        autosize=False,
-        width=2200,
-        height=1100,  # <--- increased height
-        margin=dict(l=60, r=60, t=80, b=50),
-        coloraxis_showscale=False
+def _appversion_matrix(df_app_filtered, rows, level, top_k, version_range):
+    matrix = bucket_versions(PivotMatrix.from_frame(df_app_filtered, index='appVersion'), level, version_range)
+    if rows is None:
+        return matrix.overview((top_k or HEATMAP_MAX_ROWS - 1) + 1)
+    return matrix.row_slice(*rows)
+
+
+# --------------------------------------------------------------------------------
+# Tab bodies. main() only calls the one for the open tab. Tabs with their own
+# widgets are fragments, so changing e.g. the Tab 6 App reruns just that tab.
+# Charts are built in the background (figure_jobs) and appear as they complete.
+# --------------------------------------------------------------------------------
+@profiling.profiled_section("Tab 1")
+def render_summation_tab(dataset, full_table, start_date, end_date):
+    date_index = dataset.date_index
+
+    slots = []
+    st.subheader("Top Plot (Summation) - Full Data (No Date Filter)")
+    slots.append(chart_slot(
+        dataset, ('summation',), lambda: create_summation_heatmap_from_table(full_table), "summation_top_tab1"
+    ))
+
+    st.subheader(f"Bottom Plot (Summation) - Date Filtered [{start_date} to {end_date}]")
+    slots.append(chart_slot(
+        dataset, ('summation', start_date, end_date),
+        lambda: create_summation_heatmap_from_table(date_index.query(start_date, end_date)),
+        "summation_bottom_tab1"
+    ))
+    fill_slots(slots)
+
+
+@profiling.profiled_section("Tab 2")
+def render_percentage_tab(dataset, full_table, start_date, end_date):
+    date_index = dataset.date_index
+
+    slots = []
+    st.subheader("Top Plot (Row-wise %) - Full Data (No Date Filter)")
+    slots.append(chart_slot(
+        dataset, ('percentage',), lambda: create_percentage_heatmap_from_table(full_table), "percentage_top_tab2"
+    ))
+
+    st.subheader(f"Bottom Plot (Row-wise %) - Date Filtered [{start_date} to {end_date}]")
+    slots.append(chart_slot(
+        dataset, ('percentage', start_date, end_date),
+        lambda: create_percentage_heatmap_from_table(date_index.query(start_date, end_date)),
+        "percentage_bottom_tab2"
+    ))
+    fill_slots(slots)
+
+
+@st.fragment
+@profiling.profiled_section("Tab 3")
+def render_filtered_percentage_tab(dataset, min_date, max_date, start_date, end_date):
+    date_index = dataset.date_index
+
+    st.subheader("Row-wise % Heatmaps with Additional Filters")
+    st.markdown(
+        "Use the filters below to select specific **Apps** and **kmeans_cluster_name**. "
+        "These filters apply to **both** the top (full date range) and bottom (date-filtered) plots."
     )
-    fig.update_traces(
-        hovertemplate="<b>appVersion:</b> %{y}<br>"
-                      "<b>kmeans_cluster_name:</b> %{x}<br>"
-                      "<b>% of row:</b> %{z:.2f}%",
-        texttemplate="%{z:.1f}",
-        textfont_size=12
+
+    all_apps = dataset.vocabularies['App']
+    selected_apps = st.multiselect("Select App(s)", options=all_apps, default=all_apps, key="apps_tab3")
+
+    all_clusters = dataset.vocabularies['kmeans_cluster_name']
+    selected_clusters = st.multiselect("Select kmeans_cluster_name(s)", options=all_clusters,
+                                       default=all_clusters, key="clusters_tab3")
+
+    tab3_apps = selected_apps or None
+    tab3_clusters = selected_clusters or None
+    filter_key = (tuple(selected_apps), tuple(selected_clusters))
+
+    slots = []
+    st.subheader("Top Plot - Row-wise % (Filtered by App & Cluster, No Date Filter)")
+    slots.append(chart_slot(
+        dataset, ('percentage_filtered',) + filter_key,
+        lambda: create_percentage_heatmap_from_table(
+            date_index.query(min_date, max_date, apps=tab3_apps, clusters=tab3_clusters)
+        ),
+        "percentage_top_tab3"
+    ))
+
+    st.subheader(f"Bottom Plot - Row-wise % (Filtered by App, Cluster, and Date [{start_date} to {end_date}])")
+
+    slots.append(chart_slot(
+        dataset, ('percentage_filtered', start_date, end_date) + filter_key,
+        lambda: create_percentage_heatmap_from_table(
+            date_index.query(start_date, end_date, apps=tab3_apps, clusters=tab3_clusters)
+        ),
+        "percentage_bottom_tab3"
+    ))
+    fill_slots(slots)
+
+
+@profiling.profiled_section("Tab 4")
+def render_swot_tab(dataset, full_table):
+    st.subheader("Inter-App SWOT Analysis (Top Plot, Full Data)")
+    st.markdown(
+        "This top plot starts with **row-wise %** of thumbsUpCount_222, "
+        "then converts those values to **column-wise %** so each column sums to 100%."
+    )
+
+    slots = []
+    intra_app_table = PivotMatrix.from_table(full_table).swot()
+    slots.append(chart_slot(
+        dataset, ('swot',), lambda: create_intra_app_swot_heatmap(intra_app_table), "tab4_intra_app_swot_top"
+    ))
+
+    st.subheader("Intra-App Strength Analysis (Bottom Plot, Full Data)")
+    st.markdown(
+        "Now we take the Inter-App SWOT table above (where each column sums to 100%) "
+        "and calculate **row-wise %** again, so each row sums to 100%. "
+        "We call this 'Inter-App Strength Analysis.'"
+    )
+
+    slots.append(chart_slot(
+        dataset, ('strength',), lambda: create_inter_app_strength_heatmap(intra_app_table),
+        "tab4_intra_app_strength_bottom"
+    ))
+    fill_slots(slots)
+
+
+@st.fragment
+@profiling.profiled_section("Tab 5")
+def render_single_app_time_tab(dataset):
+    st.subheader("Single App - Monthly and Daily Summation Charts (No Date Filter)")
+    st.markdown(
+        "Pick an **App** and optionally some **kmeans_cluster_name** categories. "
+        "We’ll plot monthly and daily (optionally weekly) summations of thumbsUpCount_222 with distinct colors for each cluster. "
+        "Circle size is proportional to thumbsUpCount_222, and the legend is shown at the bottom."
+    )
+
+    all_apps_5 = dataset.vocabularies['App']
+    selected_app_5 = st.selectbox("Select an App", options=all_apps_5, key="tab5_app")
+
+    all_clusters_5 = dataset.vocabularies['kmeans_cluster_name']
+    selected_clusters_5 = st.multiselect("Select kmeans_cluster_name(s) to include",
+                                         options=all_clusters_5,
+                                         default=all_clusters_5,
+                                         key="tab5_clusters")
+
+    granularities = st.multiselect("Time granularity", options=['Monthly', 'Weekly', 'Daily'],
+                                   default=['Monthly', 'Daily'], key="tab5_granularity")
+
+    @once
+    def series_tab5():
+        # One pass over the App's cube rows gives the day, week and month series
+        with profiling.stage('filter'):
+            df_tab5 = dataset.partitions.rows(selected_app_5, selected_clusters_5 or None)
+        return time_bucket_sums(df_tab5, buckets=TIME_BUCKETS)
+
+    tab5_key = (selected_app_5, tuple(selected_clusters_5))
+
+    slots = []
+    for granularity, bucket in (('Monthly', 'month'), ('Weekly', 'week'), ('Daily', 'day')):
+        if granularity not in granularities:
+            continue
+        st.subheader(f"{granularity} Summation Chart")
+        slots.append(chart_slot(
+            dataset, (bucket,) + tab5_key,
+            lambda bucket=bucket: create_time_scatter_plot_from_series(series_tab5()[bucket], bucket),
+            f"tab5_{granularity.lower()}_scatter",
+            empty_message=f"No data available for the selected filters ({granularity.lower()})."
+        ))
+    fill_slots(slots)
+
+
+@st.fragment
+@profiling.profiled_section("Tab 6")
+def render_appversion_tab(dataset):
+    st.subheader("Single AppVersion vs. kmeans_cluster_name (No Date Filter)")
+    st.markdown(
+        "Pick an **App**. We'll display two plots:\n"
+        "1. Summation heatmap of `thumbsUpCount_222` with rows=appVersion, columns=kmeans_cluster_name.\n"
+        "2. Row-wise percentage heatmap of the same table."
     )
-    return fig
+
+    # 1) Select one App
+    all_apps_6 = dataset.vocabularies['App']
+    selected_app_6 = st.selectbox("Select an App", options=all_apps_6, key="tab6_app")
+
+    # 2) Rows of that App: a slice of the App-partitioned cube, no scan or copy
+    def filtered_tab6():
+        with profiling.stage('filter'):
+            return dataset.partitions.rows(selected_app_6)
+
+    # 3) Which appVersions to show, in semantic version order
+    level_names = {'version': "Every appVersion", 'minor': "Minor releases (x.y)", 'major': "Major releases (x)"}
+    level = st.selectbox("Group appVersions", options=LEVELS, format_func=level_names.get, key="tab6_level")
+    all_versions = version_labels(filtered_tab6()['appVersion'].unique(), level)
+    version_range = None
+    if len(all_versions) > 1:
+        low, high = st.select_slider("appVersion range", options=all_versions,
+                                     value=(all_versions[0], all_versions[-1]),
+                                     key=f"tab6_range_{selected_app_6}_{level}")
+        if (low, high) != (all_versions[0], all_versions[-1]):
+            version_range = (low, high)
+    top_k = st.slider("Largest appVersions to show (the rest are summed into 'Other')",
+                      min_value=1, max_value=HEATMAP_MAX_ROWS - 1, value=HEATMAP_MAX_ROWS - 1, key="tab6_top_k")
+    n_versions = len(version_labels(all_versions, version_range=version_range))
+    view_key = (selected_app_6, level, version_range)
+
+    # 4) Summation heatmap
+    slots = []
+    st.subheader("Top Plot: Summation Heatmap (appVersion vs. kmeans_cluster_name)")
+    slots.append(chart_slot(
+        dataset, ('appversion_summation', top_k) + view_key,
+        lambda: create_appversion_summation_heatmap(filtered_tab6(), level=level, top_k=top_k,
+                                                    version_range=version_range),
+        "tab6_sum_heatmap"
+    ))
+
+    # 5) Row-wise percentage heatmap
+    st.subheader("Bottom Plot: Row-wise Percentage Heatmap")
+    slots.append(chart_slot(
+        dataset, ('appversion_percentage', top_k) + view_key,
+        lambda: create_appversion_percentage_heatmap(filtered_tab6(), level=level, top_k=top_k,
+                                                     version_range=version_range),
+        "tab6_pct_heatmap"
+    ))
+
+    # 6) Drill-down for when more rows are selected than the plots above show
+    if n_versions > top_k + 1:
+        st.subheader("Drill-down: Individual appVersions")
+        st.markdown(
+            f"**{n_versions}** appVersion rows are selected. The plots above show the "
+            f"{top_k} largest and sum the rest into an 'Other' row. "
+            f"Pick a block of rows (in version order) to see them individually."
+        )
+        n_pages = -(-n_versions // HEATMAP_MAX_ROWS)
+        page = st.selectbox(
+            "appVersion rows",
+            options=range(n_pages),
+            format_func=lambda p: f"{p * HEATMAP_MAX_ROWS + 1} - {min((p + 1) * HEATMAP_MAX_ROWS, n_versions)}",
+            key=f"tab6_drilldown_{selected_app_6}"
+        )
+        rows = (page * HEATMAP_MAX_ROWS, (page + 1) * HEATMAP_MAX_ROWS)
+
+        slots.append(chart_slot(
+            dataset, ('appversion_summation', rows) + view_key,
+            lambda: create_appversion_summation_heatmap(filtered_tab6(), rows=rows, level=level,
+                                                        version_range=version_range),
+            "tab6_sum_heatmap_rows"
+        ))
+
+        slots.append(chart_slot(
+            dataset, ('appversion_percentage', rows) + view_key,
+            lambda: create_appversion_percentage_heatmap(filtered_tab6(), rows=rows, level=level,
+                                                         version_range=version_range),
+            "tab6_pct_heatmap_rows"
+        ))
+
+    fill_slots(slots)
+
+
+@st.fragment
+@profiling.profiled_section("Tab 7")
+def render_trends_tab(dataset):
+    st.subheader("All Apps - Rolling Trends and Spikes (No Date Filter)")
+    st.markdown(
+        "Every **App / kmeans_cluster_name** series at once: thumbsUpCount_222 over the last 7 and 28 days "
+        "up to the chosen day, the change against the 7 days before, and a **spike z-score** comparing "
+        "the last 7 days with the weekly sums of the 12 weeks before. The biggest movers (up or down) come first."
+    )
+
+    as_of = st.date_input("As of", value=dataset.max_date, min_value=dataset.min_date,
+                          max_value=dataset.max_date, key="tab7_as_of")
+    rank_by = st.selectbox("Rank by", options=list(RANKINGS), format_func=RANKINGS.get, key="tab7_rank_by")
+    n_movers = st.slider("Movers to list", min_value=5, max_value=100, value=20, key="tab7_n_movers")
+
+    movers = top_movers(pair_trends(dataset.date_index, as_of), rank_by, n_movers)
+    if movers.empty:
+        st.warning("No reviews in the 28 days or 12 weeks before the selected day.")
+        fill_slots([])
+        return
+    st.dataframe(movers, hide_index=True, column_config={
+        'last_7d': "Last 7 days",
+        'prev_7d': "Previous 7 days",
+        'wow_delta': "Week-over-week change",
+        'wow_pct': st.column_config.NumberColumn("Week-over-week %", format="%.1f%%"),
+        'last_28d': "Last 28 days",
+        'baseline_mean': st.column_config.NumberColumn("Weekly baseline mean", format="%.1f"),
+        'baseline_std': st.column_config.NumberColumn("Weekly baseline std", format="%.1f"),
+        'z_score': st.column_config.NumberColumn("Spike z-score", format="%.2f"),
+    })
+
+    st.subheader(f"Rolling {SHORT_WINDOW}-day Sums of the Top {min(10, len(movers))} Movers")
+    pairs = list(zip(movers['App'][:10], movers['kmeans_cluster_name'][:10]))
+    fill_slots([chart_slot(
+        dataset, ('rolling', SHORT_WINDOW, as_of, tuple(pairs)),
+        lambda: create_rolling_trend_plot(rolling_sums(dataset.date_index, pairs, SHORT_WINDOW), SHORT_WINDOW, as_of),
+        "tab7_rolling",
+    )])
+
+
+@st.fragment
+@profiling.profiled_section("Tab 8")
+def render_comparison_tab(dataset):
+    st.subheader("Period Comparison - App x kmeans_cluster_name (B minus A)")
+    st.markdown(
+        "Pick **period A** and **period B**. The heatmaps show B minus A: the change in summed "
+        "thumbsUpCount_222, and the change in **percentage points** of the row-wise %, SWOT and "
+        "strength views (each period's percentages are of its own totals). Red is higher in B, blue lower."
+    )
+    date_index = dataset.date_index
+    min_date, max_date = dataset.min_date, dataset.max_date
+
+    # Default: the last 90 days against the 90 days before them
+    b_start = max(min_date, max_date - datetime.timedelta(days=89))
+    a_end = max(min_date, b_start - datetime.timedelta(days=1))
+    a_start = max(min_date, a_end - datetime.timedelta(days=89))
+    column_a, column_b = st.columns(2)
+    period_a = column_a.date_input("Period A", value=(a_start, a_end), min_value=min_date,
+                                   max_value=max_date, key="tab8_period_a")
+    period_b = column_b.date_input("Period B", value=(b_start, max_date), min_value=min_date,
+                                   max_value=max_date, key="tab8_period_b")
+    if len(period_a) != 2 or len(period_b) != 2:
+        st.info("Pick a start and an end date for both periods.")
+        fill_slots([])
+        return
+    period_a, period_b = tuple(period_a), tuple(period_b)
+
+    views = st.multiselect("Views", options=list(DELTA_VIEWS), default=list(DELTA_VIEWS),
+                           format_func=lambda view: DELTA_VIEWS[view][0], key="tab8_views")
+
+    @once
+    def period_matrices():
+        # Each period's App x cluster sums are two rows of the prefix-sum index;
+        # every view's delta is then derived from these two small matrices
+        return (PivotMatrix.from_table(date_index.query(*period_a)),
+                PivotMatrix.from_table(date_index.query(*period_b)))
+
+    def period_delta(view):
+        matrix_a, matrix_b = period_matrices()
+        return matrix_a.delta(matrix_b, view)
+
+    slots = []
+    for view in views:
+        st.subheader(f"{DELTA_VIEWS[view][0]}: B [{period_b[0]} to {period_b[1]}] "
+                     f"minus A [{period_a[0]} to {period_a[1]}]")
+        slots.append(chart_slot(
+            dataset, ('period_delta', view, period_a, period_b),
+            lambda view=view: create_delta_heatmap(period_delta(view), view),
+            f"tab8_delta_{view}",
+            empty_message="No reviews in either period."
+        ))
+    fill_slots(slots)
 
 
 def main():
     st.set_page_config(page_title="Heatmap Dashboard", layout="wide")
+    with profiling.rerun("script"):
+        render_dashboard()
+    profiling.render_sidebar()
+
+
+def render_dashboard():
     st.markdown("### Heatmap of Summation of Thumbs Up Counts")
 
     # ----------------------------------------------------------------
-    # 1. LOAD THE DATA
+    # 1. LOAD THE DATA (read once per process, shared read-only by all sessions;
+    #    with SM_SHARED_STORE set, attached from the store shared by all workers)
     # ----------------------------------------------------------------
-    df_shortlisted = pd.read_pickle('df_shortlisted.pkl')
+    with profiling.stage('load'):
+        dataset = serving_dataset()
+    rss_bytes = process_rss_bytes()
+    st.sidebar.caption(
+        f"Data loaded in {dataset.load_seconds:.2f}s, "
+        f"{dataset.memory_bytes / 1e6:,.1f} MB in memory, "
+        + (f"{dataset.mapped_bytes / 1e6:,.1f} MB mapped from the snapshot, " if dataset.mapped_bytes else "")
+        + f"{dataset.n_cells:,} cube cells"
+        + (f", {len(dataset.deltas)} delta batches merged" if dataset.deltas else "")
+        + (f" (process RSS {rss_bytes / 1e6:,.1f} MB)" if rss_bytes is not None else "")
+    )
+    validation = dataset.validation
+    if validation and (validation['dropped'] or validation['filled']):
+        cleaned = [f"dropped {n:,} rows without {column}" for column, n in validation['dropped'].items()]
+        cleaned += [f"set {n:,} missing {column} to 0" for column, n in validation['filled'].items()]
+        st.sidebar.caption(f"Cleaned at load ({validation['rows_kept']:,} of {validation['rows_read']:,} "
+                           f"rows kept): " + "; ".join(cleaned))
 
     # ----------------------------------------------------------------
     # 2. GLOBAL DATE FILTER (applies to bottom plots in tabs 1-3)
     # ----------------------------------------------------------------
-    st.write("#### Global Date Filter for Bottom Plots (Tabs 1-3, 4-6 are unaffected by these filters)")
-    min_date = df_shortlisted['at'].min().date()
-    max_date = df_shortlisted['at'].max().date()
+    st.write("#### Global Date Filter for Bottom Plots (Tabs 1-3; Tabs 4-8 are unaffected by these filters)")
+    min_date = dataset.min_date
+    max_date = dataset.max_date
 
     start_date = st.date_input(
         "Start Date (for bottom plots)",
@@ -419,173 +774,57 @@ def main():
     if start_date > end_date:
         st.error("Error: Start date must be before or same as end date.")
 
-    mask_global = (df_shortlisted['at'].dt.date >= start_date) & (df_shortlisted['at'].dt.date <= end_date)
-    df_bottom_filtered = df_shortlisted.loc[mask_global].copy()
+    # Tabs 1-3 only need App x cluster sums, which the prefix-sum index answers
+    # for any [start_date, end_date] without touching the rows.
+    date_index = dataset.date_index
+    full_table = date_index.query(min_date, max_date)
 
     # ----------------------------------------------------------------
     # 3. CREATE TABS
     # ----------------------------------------------------------------
-    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
+    # on_change="rerun" makes the tabs stateful, so only the open tab runs
+    # its pipeline; the others are not computed at all on this rerun.
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs([
         "Tab 1: Summation Heatmaps",
         "Tab 2: Row-wise % Heatmaps",
         "Tab 3: Row-wise % + App/Cluster Filter",
         "Tab 4: SWOT & Strength Analysis",
         "Tab 5: Single App Time Charts",
-        "Tab 6: Single AppVersion vs. kmeans_cluster"
-    ])
-
-    # ----------------------------------------
-    # TAB 1: SUMMATION HEATMAPS
-    # ----------------------------------------
-    with tab1:
-        st.subheader("Top Plot (Summation) - Full Data (No Date Filter)")
-        fig_full_sum = create_summation_heatmap(df_shortlisted)
-        st.plotly_chart(fig_full_sum, use_container_width=True, key="summation_top_tab1")
-
-        st.subheader(f"Bottom Plot (Summation) - Date Filtered [{start_date} to {end_date}]")
-        fig_filtered_sum = create_summation_heatmap(df_bottom_filtered)
-        st.plotly_chart(fig_filtered_sum, use_container_width=True, key="summation_bottom_tab1")
-
-    # ----------------------------------------
-    # TAB 2: ROW-WISE % HEATMAPS
-    # ----------------------------------------
-    with tab2:
-        st.subheader("Top Plot (Row-wise %) - Full Data (No Date Filter)")
-        fig_full_pct = create_percentage_heatmap(df_shortlisted)
-        st.plotly_chart(fig_full_pct, use_container_width=True, key="percentage_top_tab2")
-
-        st.subheader(f"Bottom Plot (Row-wise %) - Date Filtered [{start_date} to {end_date}]")
-        fig_filtered_pct = create_percentage_heatmap(df_bottom_filtered)
-        st.plotly_chart(fig_filtered_pct, use_container_width=True, key="percentage_bottom_tab2")
-
-    # ----------------------------------------
-    # TAB 3: ROW-WISE % + APP & CLUSTER FILTERS
-    # ----------------------------------------
-    with tab3:
-        st.subheader("Row-wise % Heatmaps with Additional Filters")
-        st.markdown(
-            "Use the filters below to select specific **Apps** and **kmeans_cluster_name**. "
-            "These filters apply to **both** the top (full date range) and bottom (date-filtered) plots."
-        )
-
-        all_apps = sorted(df_shortlisted['App'].unique())
-        selected_apps = st.multiselect("Select App(s)", options=all_apps, default=all_apps, key="apps_tab3")
-
-        all_clusters = sorted(df_shortlisted['kmeans_cluster_name'].unique())
-        selected_clusters = st.multiselect("Select kmeans_cluster_name(s)", options=all_clusters,
-                                           default=all_clusters, key="clusters_tab3")
-
-        df_tab3_top = df_shortlisted.copy()
-        if selected_apps:
-            df_tab3_top = df_tab3_top[df_tab3_top['App'].isin(selected_apps)]
-        if selected_clusters:
-            df_tab3_top = df_tab3_top[df_tab3_top['kmeans_cluster_name'].isin(selected_clusters)]
-
-        st.subheader("Top Plot - Row-wise % (Filtered by App & Cluster, No Date Filter)")
-        fig_tab3_top = create_percentage_heatmap(df_tab3_top)
-        st.plotly_chart(fig_tab3_top, use_container_width=True, key="percentage_top_tab3")
-
-        st.subheader(f"Bottom Plot - Row-wise % (Filtered by App, Cluster, and Date [{start_date} to {end_date}])")
-
-        df_tab3_bottom = df_bottom_filtered.copy()
-        if selected_apps:
-            df_tab3_bottom = df_tab3_bottom[df_tab3_bottom['App'].isin(selected_apps)]
-        if selected_clusters:
-            df_tab3_bottom = df_tab3_bottom[df_tab3_bottom['kmeans_cluster_name'].isin(selected_clusters)]
-
-        fig_tab3_bottom = create_percentage_heatmap(df_tab3_bottom)
-        st.plotly_chart(fig_tab3_bottom, use_container_width=True, key="percentage_bottom_tab3")
-
-    # ----------------------------------------
-    # TAB 4: SWOT & STRENGTH ANALYSIS
-    # ----------------------------------------
-    with tab4:
-        st.subheader("Inter-App SWOT Analysis (Top Plot, Full Data)")
-        st.markdown(
-            "This top plot starts with **row-wise %** of thumbsUpCount_222, "
-            "then converts those values to **column-wise %** so each column sums to 100%."
-        )
-
-        intra_app_table = get_intra_app_swot_table(df_shortlisted)
-        fig_intra_app_swot = create_intra_app_swot_heatmap(intra_app_table)
-        st.plotly_chart(fig_intra_app_swot, use_container_width=True, key="tab4_intra_app_swot_top")
-
-        st.subheader("Intra-App Strength Analysis (Bottom Plot, Full Data)")
-        st.markdown(
-            "Now we take the Inter-App SWOT table above (where each column sums to 100%) "
-            "and calculate **row-wise %** again, so each row sums to 100%. "
-            "We call this 'Inter-App Strength Analysis.'"
-        )
-
-        fig_inter_app_strength = create_inter_app_strength_heatmap(intra_app_table)
-        st.plotly_chart(fig_inter_app_strength, use_container_width=True, key="tab4_intra_app_strength_bottom")
-
-    # ----------------------------------------
-    # TAB 5: SINGLE APP TIME CHARTS
-    # ----------------------------------------
-    with tab5:
-        st.subheader("Single App - Monthly and Daily Summation Charts (No Date Filter)")
-        st.markdown(
-            "Pick an **App** and optionally some **kmeans_cluster_name** categories. "
-            "We’ll plot monthly and daily summations of thumbsUpCount_222 with distinct colors for each cluster. "
-            "Circle size is proportional to thumbsUpCount_222, and the legend is shown at the bottom."
-        )
-
-        all_apps_5 = sorted(df_shortlisted['App'].unique())
-        selected_app_5 = st.selectbox("Select an App", options=all_apps_5, key="tab5_app")
-
-        all_clusters_5 = sorted(df_shortlisted['kmeans_cluster_name'].unique())
-        selected_clusters_5 = st.multiselect("Select kmeans_cluster_name(s) to include",
-                                             options=all_clusters_5,
-                                             default=all_clusters_5,
-                                             key="tab5_clusters")
-
-        df_tab5 = df_shortlisted.copy()
-        df_tab5 = df_tab5[df_tab5['App'] == selected_app_5]
-        if selected_clusters_5:
-            df_tab5 = df_tab5[df_tab5['kmeans_cluster_name'].isin(selected_clusters_5)]
-
-        st.subheader("Monthly Summation Chart")
-        fig_monthly = create_monthly_scatter_plot(df_tab5)
-        if fig_monthly is None:
-            st.warning("No data available for the selected filters (monthly).")
-        else:
-            st.plotly_chart(fig_monthly, use_container_width=True, key="tab5_monthly_scatter")
-
-        st.subheader("Daily Summation Chart")
-        fig_daily = create_daily_scatter_plot(df_tab5)
-        if fig_daily is None:
-            st.warning("No data available for the selected filters (daily).")
-        else:
-            st.plotly_chart(fig_daily, use_container_width=True, key="tab5_daily_scatter")
-
-    # ----------------------------------------
-    # TAB 6: SINGLE APPVERSION vs. kmeans_cluster
-    # ----------------------------------------
-    with tab6:
-        st.subheader("Single AppVersion vs. kmeans_cluster_name (No Date Filter)")
-        st.markdown(
-            "Pick an **App**. We'll display two plots:\n"
-            "1. Summation heatmap of `thumbsUpCount_222` with rows=appVersion, columns=kmeans_cluster_name.\n"
-            "2. Row-wise percentage heatmap of the same table."
-        )
-
-        # 1) Select one App
-        all_apps_6 = sorted(df_shortlisted['App'].unique())
-        selected_app_6 = st.selectbox("Select an App", options=all_apps_6, key="tab6_app")
-
-        # 2) Filter data for that App
-        df_tab6 = df_shortlisted[df_shortlisted['App'] == selected_app_6].copy()
-
-        # 3) Summation heatmap (increased height)
-        st.subheader("Top Plot: Summation Heatmap (appVersion vs. kmeans_cluster_name)")
-        fig_tab6_sum = create_appversion_summation_heatmap(df_tab6)  # <-- increased height inside function
-        st.plotly_chart(fig_tab6_sum, use_container_width=True, key="tab6_sum_heatmap")
-
-        # 4) Row-wise percentage heatmap (increased height)
-        st.subheader("Bottom Plot: Row-wise Percentage Heatmap")
-        fig_tab6_pct = create_appversion_percentage_heatmap(df_tab6)  # <-- increased height inside function
-        st.plotly_chart(fig_tab6_pct, use_container_width=True, key="tab6_pct_heatmap")
+        "Tab 6: Single AppVersion vs. kmeans_cluster",
+        "Tab 7: Trends & Spikes (All Apps)",
+        "Tab 8: Period Comparison"
+    ], key="main_tabs", on_change="rerun")
+
+    if tab1.open:
+        with tab1:
+            render_summation_tab(dataset, full_table, start_date, end_date)
+    if tab2.open:
+        with tab2:
+            render_percentage_tab(dataset, full_table, start_date, end_date)
+    if tab3.open:
+        with tab3:
+            render_filtered_percentage_tab(dataset, min_date, max_date, start_date, end_date)
+    if tab4.open:
+        with tab4:
+            render_swot_tab(dataset, full_table)
+    if tab5.open:
+        with tab5:
+            render_single_app_time_tab(dataset)
+    if tab6.open:
+        with tab6:
+            render_appversion_tab(dataset)
+    if tab7.open:
+        with tab7:
+            render_trends_tab(dataset)
+    if tab8.open:
+        with tab8:
+            render_comparison_tab(dataset)
+
+    cache_stats = get_figure_cache().stats()
+    st.sidebar.caption(
+        f"Figure cache: {cache_stats['entries']} figures, {cache_stats['size_bytes'] / 1e6:,.1f} MB, "
+        f"{cache_stats['hits']} hits / {cache_stats['misses']} misses, {cache_stats['evictions']} evictions"
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,238 @@
+"""
+Benchmarks for the dashboard's aggregation and figure-building hot paths.
+
+    python -m benchmarks.run_benchmarks --rows 10000 1000000 --output bench.json
+    python -m benchmarks.run_benchmarks --rows 10000 1000000 --compare bench.json
+
+Each case is split into stages (e.g. aggregation / figure / serialize) that are
+timed separately over --repeat runs on synthetic data (see synthetic.py). A
+final untimed run per case records peak Python-heap memory with tracemalloc.
+Results are written as JSON so later runs can be compared against them with
+--compare, which flags stages that got slower than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import plotly
+
+from aggregates import DateRangeIndex, build_daily_cube, time_bucket_sums
+from app import (create_daily_scatter_plot, create_intra_app_swot_heatmap,
+                 create_summation_heatmap_from_table, get_intra_app_swot_table,
+                 get_summation_table)
+from benchmarks.synthetic import START, generate_reviews
+from pivots import PivotMatrix
+from trends import pair_trends, rolling_sums, top_movers
+
+
+def case_load(df):
+    cube = {}
+    return [
+        ('cube', lambda: cube.setdefault('cube', build_daily_cube(df))),
+        ('date_index', lambda: DateRangeIndex(cube['cube'])),
+    ]
+
+
+def case_date_filter(df):
+    index = DateRangeIndex(build_daily_cube(df))
+    last_day = df['at'].max()
+    start_date = (START + (last_day - START) / 4).date()
+    end_date = (START + (last_day - START) * 3 / 4).date()
+    return [
+        ('index_query', lambda: index.query(start_date, end_date)),
+    ]
+
+
+def case_period_delta(df):
+    index = DateRangeIndex(build_daily_cube(df))
+    middle = (START + (df['at'].max() - START) / 2).date()
+    first_day, last_day = START.date(), df['at'].max().date()
+    return [
+        ('periods', lambda: PivotMatrix.from_table(index.query(first_day, middle)).delta(
+            PivotMatrix.from_table(index.query(middle, last_day)), 'strength'
+        )),
+    ]
+
+
+def case_summation_heatmap(df):
+    state = {}
+    return [
+        ('aggregation', lambda: state.update(table=get_summation_table(df))),
+        ('figure', lambda: state.update(fig=create_summation_heatmap_from_table(state['table']))),
+        ('serialize', lambda: state['fig'].to_json()),
+    ]
+
+
+def case_intra_app_swot(df):
+    state = {}
+    return [
+        ('aggregation', lambda: state.update(table=get_intra_app_swot_table(df))),
+        ('figure', lambda: state.update(fig=create_intra_app_swot_heatmap(state['table']))),
+        ('serialize', lambda: state['fig'].to_json()),
+    ]
+
+
+def case_time_buckets(df):
+    app = df['App'].value_counts().index[0]
+    rows = df[df['App'] == app]
+    return [
+        ('day_week_month', lambda: time_bucket_sums(rows)),
+    ]
+
+
+def case_trends(df):
+    index = DateRangeIndex(build_daily_cube(df))
+    state = {}
+    return [
+        ('all_pairs', lambda: state.update(movers=top_movers(pair_trends(index)))),
+        ('rolling', lambda: rolling_sums(
+            index, list(zip(state['movers']['App'][:10], state['movers']['kmeans_cluster_name'][:10]))
+        )),
+    ]
+
+
+def case_daily_scatter(df):
+    # The most reviewed App: the worst case for the single-App views
+    app = df['App'].value_counts().index[0]
+    state = {}
+    return [
+        ('filter', lambda: state.update(rows=df[df['App'] == app])),
+        # create_daily_scatter_plot buckets by day itself, so this includes its aggregation
+        ('figure', lambda: state.update(fig=create_daily_scatter_plot(state['rows']))),
+        ('serialize', lambda: state['fig'].to_json()),
+    ]
+
+
+CASES = {
+    'load': case_load,
+    'date_filter': case_date_filter,
+    'period_delta': case_period_delta,
+    'summation_heatmap': case_summation_heatmap,
+    'intra_app_swot': case_intra_app_swot,
+    'time_buckets': case_time_buckets,
+    'trends': case_trends,
+    'daily_scatter': case_daily_scatter,
+}
+
+
+def run_case(make_stages, df, repeat):
+    """
+    Time every stage `repeat` times (stages run in order, so later stages can use
+    earlier results) and measure peak traced memory of one extra run.
+    """
+    timings = {}
+    for _ in range(repeat):
+        for name, stage in make_stages(df):
+            started = time.perf_counter()
+            stage()
+            timings.setdefault(name, []).append(time.perf_counter() - started)
+
+    stages = make_stages(df)
+    tracemalloc.start()
+    for _, stage in stages:
+        stage()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    results = {}
+    for name, seconds in timings.items():
+        median = statistics.median(seconds)
+        results[name] = {
+            'median_s': median,
+            'min_s': min(seconds),
+            'rows_per_s': len(df) / median if median > 0 else None,
+        }
+    return {'stages': results, 'peak_bytes': peak_bytes}
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'plotly': plotly.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Print new/old median ratios for every stage present in both runs.
+    Returns the number of stages slower than `threshold`.
+    """
+    regressions = 0
+    for size, cases in results.items():
+        for case, result in cases.items():
+            old_case = baseline.get(size, {}).get(case)
+            if old_case is None:
+                continue
+            for stage, timing in result['stages'].items():
+                old = old_case['stages'].get(stage)
+                if old is None or not old['median_s']:
+                    continue
+                ratio = timing['median_s'] / old['median_s']
+                flag = "  REGRESSION" if ratio > threshold else ""
+                regressions += bool(flag)
+                print(f"{size:>10} {case:>18} {stage:>12}  {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard's aggregation and figure paths.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help="Total reviews per synthetic dataset (one run per value).")
+    parser.add_argument('--apps', type=int, default=20)
+    parser.add_argument('--clusters', type=int, default=30)
+    parser.add_argument('--versions', type=int, default=200, help="Distinct appVersions per App.")
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), default=list(CASES))
+    parser.add_argument('--output', help="Write results as JSON to this path.")
+    parser.add_argument('--compare', help="JSON from an earlier run to compare against.")
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help="New/old median ratio above which a stage counts as a regression.")
+    args = parser.parse_args()
+
+    results = {}
+    for n_rows in args.rows:
+        df = generate_reviews(n_rows, n_apps=args.apps, n_clusters=args.clusters,
+                              n_versions=args.versions, n_days=args.days, seed=args.seed)
+        results[str(n_rows)] = {}
+        for case in args.cases:
+            result = run_case(CASES[case], df, args.repeat)
+            results[str(n_rows)][case] = result
+            for stage, timing in result['stages'].items():
+                print(f"{n_rows:>10} {case:>18} {stage:>12}  {timing['median_s'] * 1000:10.2f} ms  "
+                      f"{timing['rows_per_s'] or 0:14,.0f} rows/s")
+            print(f"{n_rows:>10} {case:>18} {'peak':>12}  {result['peak_bytes'] / 1e6:10.1f} MB")
+        del df
+
+    report = {
+        'parameters': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'environment': environment(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('parameters', {}).get('seed') != args.seed:
+            print("Warning: baseline was generated with a different seed.")
+        if compare(results, baseline['results'], args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
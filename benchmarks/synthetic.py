@@ -0,0 +1,58 @@
+"""
+Synthetic review data shaped like df_shortlisted.pkl, for benchmarks.
+
+Apps, clusters and appVersions are drawn from skewed (Zipf-like) distributions
+so a few keys dominate, as in the real data; timestamps are spread uniformly
+over `n_days`. The same arguments and seed always give the same frame.
+"""
+import numpy as np
+import pandas as pd
+
+START = pd.Timestamp('2022-01-01')
+
+# Rows generated per step, to keep temporary arrays small for 50M-row frames
+_CHUNK_ROWS = 5_000_000
+
+
+def generate_reviews(n_reviews, n_apps=20, n_clusters=30, n_versions=200, n_days=730, seed=0):
+    """
+    Review table with the dashboard columns in their compact in-memory form
+    (categorical App / kmeans_cluster_name / appVersion, int32 thumbs, datetime64 'at').
+    - n_versions: distinct appVersions per App
+    """
+    rng = np.random.default_rng(seed)
+    apps = [f"App {i:03d}" for i in range(n_apps)]
+    clusters = [f"cluster {i:03d}" for i in range(n_clusters)]
+    # Same version numbers for every App; categories sorted like compact_reviews() does
+    versions = sorted(f"{1 + i // 100}.{(i // 10) % 10}.{i % 10}" for i in range(n_versions))
+
+    app_codes = np.empty(n_reviews, dtype=np.int32)
+    cluster_codes = np.empty(n_reviews, dtype=np.int32)
+    version_codes = np.empty(n_reviews, dtype=np.int32)
+    thumbs = np.empty(n_reviews, dtype=np.int32)
+    seconds = np.empty(n_reviews, dtype=np.int64)
+
+    app_p = _zipf_weights(n_apps)
+    cluster_p = _zipf_weights(n_clusters)
+    version_p = _zipf_weights(n_versions)
+    for start in range(0, n_reviews, _CHUNK_ROWS):
+        stop = min(start + _CHUNK_ROWS, n_reviews)
+        size = stop - start
+        app_codes[start:stop] = rng.choice(n_apps, size=size, p=app_p)
+        cluster_codes[start:stop] = rng.choice(n_clusters, size=size, p=cluster_p)
+        version_codes[start:stop] = rng.choice(n_versions, size=size, p=version_p)
+        thumbs[start:stop] = rng.geometric(0.2, size=size) - 1
+        seconds[start:stop] = rng.integers(0, n_days * 86400, size=size)
+
+    return pd.DataFrame({
+        'App': pd.Categorical.from_codes(app_codes, categories=apps),
+        'kmeans_cluster_name': pd.Categorical.from_codes(cluster_codes, categories=clusters),
+        'thumbsUpCount_222': thumbs,
+        'at': START + pd.to_timedelta(seconds, unit='s'),
+        'appVersion': pd.Categorical.from_codes(version_codes, categories=versions),
+    })
+
+
+def _zipf_weights(n, exponent=1.1):
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
@@ -0,0 +1,170 @@
+"""
+Build the dashboard's daily cube from a raw review export that does not fit in memory.
+
+    python build_cube.py reviews_export.csv df_shortlisted.feather --chunk-rows 1000000
+
+The export is streamed in chunks of --chunk-rows rows, reading only the columns
+the dashboard uses. Each chunk is cleaned (see data_store.prepare_reviews) and
+collapsed into a partial daily cube in a pool of worker processes, and the
+partial cubes are merged as they arrive, so memory stays bounded by about
+(2 x workers) chunks plus the cube itself, however long the history is.
+
+The output holds one row per (day, App, appVersion, kmeans_cluster_name) with
+the thumbsUpCount_222 sum and the number of reviews (n_reviews), and the
+dashboard loads it like any other dataset. Inputs: .csv, .parquet, .feather /
+.arrow, .jsonl files, or a directory of .parquet files.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as pa_dataset
+
+from aggregates import build_daily_cube, combine_daily_cubes
+from data_store import DatasetError, check_columns, columns_to_read, prepare_reviews, write_columnar
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.feather': 'ipc', '.arrow': 'ipc', '.jsonl': 'json'}
+
+# Partial cubes are merged into the running cube once this many chunks are waiting
+MERGE_EVERY_CHUNKS = 4
+
+# Batches / files the scanner reads ahead of the chunk being assembled; its defaults
+# (16 / 4) would buffer far more than the chunks the workers have in flight
+BATCH_READAHEAD = 1
+FRAGMENT_READAHEAD = 1
+
+
+def open_export(path):
+    """
+    pyarrow dataset over the export at `path`, checked for the dashboard columns.
+    """
+    if os.path.isdir(path):
+        source_format = 'parquet'
+    else:
+        source_format = FORMATS.get(os.path.splitext(path)[1].lower())
+    if source_format is None:
+        raise DatasetError(
+            f"Cannot stream {path!r}; expected one of {', '.join(FORMATS)} or a directory of .parquet files"
+        )
+    if source_format == 'csv':
+        # Empty fields are missing values, as pandas.read_csv reads them
+        source_format = pa_dataset.CsvFileFormat(convert_options=pa_csv.ConvertOptions(strings_can_be_null=True))
+    export = pa_dataset.dataset(path, format=source_format)
+    check_columns(export.schema.names)
+    return export
+
+
+def iter_chunks(batches, chunk_rows):
+    """
+    Record batches of exactly `chunk_rows` rows (the last one may be shorter)
+    from `batches`, which the scanner cuts to sizes of its own (e.g. CSV and
+    JSON arrive in blocks of about 1 MB). Each chunk owns a copy of its rows,
+    so sending it to a worker does not ship the rest of the blocks it was cut from.
+    """
+    pending = []
+    n_pending = 0
+    for batch in batches:
+        while len(batch):
+            take = min(chunk_rows - n_pending, len(batch))
+            pending.append(batch.slice(0, take))
+            n_pending += take
+            batch = batch.slice(take)
+            if n_pending == chunk_rows:
+                yield pa.concat_batches(pending)
+                pending, n_pending = [], 0
+    if pending:
+        yield pa.concat_batches(pending)
+
+
+def chunk_cube(chunk):
+    """
+    (partial daily cube, validation report) of one Arrow chunk of reviews.
+    """
+    df, report = prepare_reviews(chunk.to_pandas())
+    return build_daily_cube(df), report
+
+
+def build_cube(path, chunk_rows=DEFAULT_CHUNK_ROWS, workers=None, on_progress=None):
+    """
+    (daily cube, validation report) of the export at `path`, built chunk by chunk.
+    At most 2 x `workers` chunks are read ahead of the workers. `on_progress`,
+    if given, is called with the number of rows aggregated so far.
+    """
+    export = open_export(path)
+    columns = columns_to_read(export.schema.names)
+    batches = export.to_batches(columns=columns, batch_size=chunk_rows, batch_readahead=BATCH_READAHEAD,
+                                fragment_readahead=FRAGMENT_READAHEAD)
+    workers = workers or os.cpu_count() or 1
+
+    report = {'rows_read': 0, 'rows_kept': 0, 'dropped': {}, 'filled': {}}
+    cube = None
+    partials = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        running = set()
+        for chunk in iter_chunks(batches, chunk_rows):
+            running.add(pool.submit(chunk_cube, chunk))
+            if len(running) < 2 * workers:
+                continue
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                partial, chunk_report = future.result()
+                _add_report(report, chunk_report)
+                partials.append(partial)
+            if len(partials) >= MERGE_EVERY_CHUNKS:
+                cube = combine_daily_cubes(partials if cube is None else [cube] + partials)
+                partials = []
+            if on_progress:
+                on_progress(report['rows_read'])
+        for future in running:
+            partial, chunk_report = future.result()
+            _add_report(report, chunk_report)
+            partials.append(partial)
+
+    if cube is not None:
+        partials.insert(0, cube)
+    if not partials:
+        raise DatasetError(f"{path!r} holds no reviews")
+    return combine_daily_cubes(partials), report
+
+
+def _add_report(total, report):
+    total['rows_read'] += report['rows_read']
+    total['rows_kept'] += report['rows_kept']
+    for kind in ('dropped', 'filled'):
+        for column, n in report[kind].items():
+            total[kind][column] = total[kind].get(column, 0) + n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a raw review export into the dashboard's daily cube.")
+    parser.add_argument('source', help="Review export: .csv, .parquet, .feather/.arrow, .jsonl or a parquet directory.")
+    parser.add_argument('target', nargs='?', default='df_shortlisted.feather')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f"Rows per chunk (default: {DEFAULT_CHUNK_ROWS:,}); lower it to use less memory.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="Worker processes (default: one per CPU).")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        cube, report = build_cube(
+            args.source, args.chunk_rows, args.workers,
+            on_progress=lambda rows: print(f"  {rows:,} rows aggregated", flush=True),
+        )
+    except DatasetError as exc:
+        parser.error(str(exc))
+    write_columnar(cube.drop(columns='day'), args.target)
+
+    cleaned = [f"dropped {n:,} rows without {column}" for column, n in report['dropped'].items()]
+    cleaned += [f"set {n:,} missing {column} to 0" for column, n in report['filled'].items()]
+    print(f"Wrote {len(cube):,} cube cells from {report['rows_read']:,} rows to {args.target} "
+          f"in {time.perf_counter() - started:.1f}s" + (f" ({'; '.join(cleaned)})" if cleaned else ""))
+
+
+if __name__ == "__main__":
+    main()
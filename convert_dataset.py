@@ -0,0 +1,37 @@
+"""
+Convert the pickled review dataset into the columnar file the dashboard prefers.
+
+    python convert_dataset.py [df_shortlisted.pkl] [df_shortlisted.feather] [--dashboard-columns-only]
+
+All columns are kept by default (the dashboard still only reads the ones it
+needs) and the dashboard columns are stored dictionary-encoded with narrow
+dtypes; pass --dashboard-columns-only to drop the rest, e.g. the review text.
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from data_store import DASHBOARD_COLUMNS, compact_reviews, write_columnar
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert df_shortlisted.pkl to an Arrow/Feather file.")
+    parser.add_argument('source', nargs='?', default='df_shortlisted.pkl')
+    parser.add_argument('target', nargs='?', default='df_shortlisted.feather')
+    parser.add_argument('--dashboard-columns-only', action='store_true',
+                        help="Only write the columns the dashboard reads.")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    df = pd.read_pickle(args.source)
+    if args.dashboard_columns_only:
+        df = df[DASHBOARD_COLUMNS]
+    # Dictionary-encode the dashboard columns so they load straight back as categoricals
+    write_columnar(compact_reviews(df), args.target)
+    print(f"Wrote {len(df):,} rows x {len(df.columns)} columns to {args.target} "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
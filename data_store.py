@@ -0,0 +1,745 @@
+"""
+Process-wide loading of the shortlisted review dataset.
+
+The dataset is read once per server process and its aggregates are shared by
+every Streamlit session. The review rows themselves are only kept until the
+daily cube is built. Sessions must treat the shared frames as read-only:
+anything that needs to add or modify columns has to work on a copy.
+
+Each call to `get_dataset()` stats the source file. When its modification time
+or size changes, the file is hashed and, if the content really changed, it is
+re-read and the shared dataset is swapped out.
+
+Two on-disk formats are supported:
+- Arrow IPC / Feather (`.feather`, `.arrow`): columnar, written uncompressed so
+  it can be memory-mapped, and only DASHBOARD_COLUMNS are read from it.
+- Pickle (`.pkl`): the original export. The whole frame has to be deserialized,
+  but only DASHBOARD_COLUMNS are kept afterwards.
+Use `python convert_dataset.py` to turn the pickle into the columnar file.
+
+Loading validates the schema and cleans the rows once (see prepare_reviews),
+then builds the cube and date index. The result is saved next to the dataset
+in `<dataset file>.prepared/` (e.g. `df_shortlisted.feather.prepared/`), so later startups
+with an unchanged file memory-map it instead of redoing any of that work.
+
+How the daily cube is built is pluggable (BACKENDS, chosen with SM_BACKEND):
+- pandas (default): the review rows are read into memory and grouped there
+- duckdb: the grouping runs inside DuckDB over the columnar file and only the
+  cube is loaded, for datasets larger than memory (see duckdb_backend.py)
+
+New reviews do not require rewriting that file: append_reviews() drops each
+batch into the `<dataset>.deltas/` directory next to it (e.g.
+`df_shortlisted.deltas/`). On the next rerun the store merges new delta files
+into the shared dataset, updating the date index only for the days the batch
+touches and keeping the batch's cube as a layer next to the main one until
+enough batches pile up to merge them (see LoadedDataset.with_delta). Each such
+merge is saved as the prepared artifact, so a new process only replays the
+batches that came after it. Delta files are applied in file-name order.
+"""
+import copy
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+import pyarrow.feather as feather
+
+import duckdb_backend
+from aggregates import (AppPartitions, DateRangeIndex, build_daily_cube, combine_daily_cubes, held_nbytes,
+                        merge_daily_cubes, with_day_numbers)
+
+# Preferred first: the columnar file when it has been generated, else the pickle
+DATA_PATHS = ('df_shortlisted.feather', 'df_shortlisted.pkl')
+
+# The only columns any view reads; everything else (e.g. review text) stays on disk
+DASHBOARD_COLUMNS = ['App', 'kmeans_cluster_name', 'thumbsUpCount_222', 'at', 'appVersion']
+
+# Read too when present: reviews per row in pre-aggregated files (see build_cube.py)
+COUNT_COLUMN = 'n_reviews'
+
+# String columns held as dictionary-encoded categoricals with sorted vocabularies
+CATEGORICAL_COLUMNS = ['App', 'kmeans_cluster_name', 'appVersion']
+
+COLUMNAR_SUFFIXES = ('.feather', '.arrow')
+
+DELTA_SUFFIXES = COLUMNAR_SUFFIXES + ('.pkl',)
+
+BACKEND_ENV = 'SM_BACKEND'
+DEFAULT_BACKEND = 'pandas'
+
+# Version of the snapshot layout and cleaning rules; older prepared artifacts are rebuilt
+SNAPSHOT_FORMAT = 3
+
+# Delta batches are held as layers next to the cube until they add up to this share
+# of its cells, or to this many batches; then they are merged into it in one pass
+COMPACT_LAYER_SHARE = 0.25
+COMPACT_MAX_LAYERS = 16
+
+# File in a snapshot directory naming the current snapshot
+CURRENT_FILE = 'CURRENT'
+
+# Rows without these cannot appear in any view, so they are dropped at load
+REQUIRED_VALUES = ['at', 'App', 'kmeans_cluster_name']
+
+_HASH_CHUNK_BYTES = 1 << 20
+
+
+class DatasetError(ValueError):
+    """
+    The dataset cannot be used by the dashboard, e.g. a required column is missing.
+    """
+
+
+class LoadedDataset:
+    """
+    The shared review aggregates plus bookkeeping about how they were loaded.
+    - version: changes whenever the data does (base content hash + applied deltas)
+    - base_version: content hash of the base file
+    - deltas: names of the delta files merged in, in order
+    - pending_deltas: how many of the last `deltas` are still held as layers (see with_delta)
+    - load_seconds: wall time spent reading and deserializing the files
+    - memory_bytes: memory this process holds for the cube, date index and partitions
+      (deep, including strings); arrays memory-mapped from a snapshot are left out
+    - mapped_bytes: size of the snapshot files the arrays are memory-mapped from
+      (prepared artifact or shared store), shared with every process mapping them
+    - cube: daily (day, App, appVersion, kmeans_cluster_name) sums, see build_daily_cube,
+      in (App, kmeans_cluster_name) order
+    - n_cells: cube cells held, counting a cell once per layer it appears in
+    - date_index: prefix sums over the cube for date-range App x cluster queries
+    - partitions: the cube grouped by App for single-App views, see AppPartitions
+    - vocabularies: sorted distinct values of each CATEGORICAL_COLUMNS column
+    - min_date / max_date: first and last review day (None without reviews)
+    - validation: what prepare_reviews dropped or filled in the base file
+    """
+
+    def __init__(self, path, version, load_seconds, cube, date_index=None,
+                 base_version=None, deltas=(), mapped_bytes=0, validation=None):
+        self.partitions = AppPartitions(cube)
+        # The partitions are views into the cube in App order: keep that one copy as the cube
+        cube = self.partitions.rows_by_app
+        self._cube = cube
+        self._layers = ()
+        self._merged = None
+        self.n_cells = len(cube)
+        self.min_date = cube['at'].min().date() if len(cube) else None
+        self.max_date = cube['at'].max().date() if len(cube) else None
+        self.validation = validation
+        self.date_index = date_index or DateRangeIndex(cube)
+        self.vocabularies = {column: list(cube[column].cat.categories) for column in CATEGORICAL_COLUMNS}
+        self.path = path
+        self.version = version
+        self.base_version = base_version or version
+        self.deltas = tuple(deltas)
+        self.pending_deltas = 0
+        self.load_seconds = load_seconds
+        self.mapped_bytes = mapped_bytes
+        self.memory_bytes = _cube_bytes(cube) + self.date_index.nbytes + self.partitions.nbytes
+
+    @property
+    def cube(self):
+        """
+        The daily cube of the base file and every delta. Layers still held
+        separately are merged into it on first use (and kept for later calls).
+        """
+        if not self._layers:
+            return self._cube
+        if self._merged is None:
+            self._merged = merge_daily_cubes(self._cube, combine_daily_cubes(self._layers))
+        return self._merged
+
+    def with_delta(self, name, delta, load_seconds=0.0):
+        """
+        New LoadedDataset with the review batch `delta` (rows, not kept) appended;
+        this dataset is left unchanged, so sessions still rendering from it see a
+        consistent snapshot. The date index is updated for the touched days only.
+        The batch's cube is kept as a layer of its own next to the cube, which
+        costs about the size of the batch; once the layers add up to
+        COMPACT_LAYER_SHARE of the cube (or COMPACT_MAX_LAYERS batches) they are
+        merged into it in one pass, and pending_deltas drops back to 0.
+        """
+        delta_cube = build_daily_cube(delta)
+        version = hashlib.sha1(f"{self.version}+{name}".encode()).hexdigest()
+        date_index = self.date_index.extended(delta_cube)
+        layers = self._layers + (delta_cube,)
+        if (sum(len(layer) for layer in layers) > COMPACT_LAYER_SHARE * len(self._cube)
+                or len(layers) > COMPACT_MAX_LAYERS):
+            return LoadedDataset(
+                self.path, version, self.load_seconds + load_seconds,
+                merge_daily_cubes(self._cube, combine_daily_cubes(layers)),
+                date_index=date_index,
+                base_version=self.base_version,
+                deltas=self.deltas + (name,),
+                validation=self.validation,
+            )
+
+        new = copy.copy(self)
+        new._layers = layers
+        new._merged = None
+        new.n_cells = self.n_cells + len(delta_cube)
+        if len(delta_cube):
+            first, last = delta_cube['at'].iloc[0].date(), delta_cube['at'].iloc[-1].date()
+            new.min_date = min(self.min_date, first) if self.min_date else first
+            new.max_date = max(self.max_date, last) if self.max_date else last
+        new.date_index = date_index
+        new.partitions = self.partitions.with_layer(delta_cube)
+        new.vocabularies = {
+            column: sorted(set(values).union(delta_cube[column].dropna().unique()))
+            for column, values in self.vocabularies.items()
+        }
+        new.version = version
+        new.deltas = self.deltas + (name,)
+        new.pending_deltas = self.pending_deltas + 1
+        new.load_seconds = self.load_seconds + load_seconds
+        new.memory_bytes = (self.memory_bytes + _cube_bytes(delta_cube) + date_index.nbytes - self.date_index.nbytes
+                            + new.partitions.nbytes - self.partitions.nbytes)
+        return new
+
+
+class DataStore:
+    """
+    Holds one LoadedDataset per source path, merges new delta files into it and
+    reloads everything when the base file changes (or an applied delta changes).
+    Safe to share between the threads Streamlit uses for concurrent sessions.
+    """
+
+    def __init__(self, path, backend=DEFAULT_BACKEND):
+        if backend not in BACKENDS:
+            raise ValueError(f"unknown backend {backend!r}, expected one of {sorted(BACKENDS)}")
+        self.path = path
+        self.backend = backend
+        self.delta_dir = delta_dir_for(path)
+        self._lock = threading.Lock()
+        self._dataset = None
+        self._signature = None
+        self._applied = []
+
+    def get(self):
+        signature = _file_signature(self.path)
+        deltas = _list_deltas(self.delta_dir)
+        with self._lock:
+            if self._dataset is not None and signature != self._signature:
+                # mtime/size moved; only reload if the content actually differs
+                if _file_hash(self.path) != self._dataset.base_version:
+                    self._dataset = None
+            if self._dataset is not None and deltas[:len(self._applied)] != self._applied:
+                # An applied delta was removed or rewritten: start over
+                self._dataset = None
+            if self._dataset is None:
+                # The prepared artifact may already hold the first few deltas
+                self._dataset = _read_dataset(self.path, self.backend, deltas)
+                self._applied = deltas[:len(self._dataset.deltas)]
+            self._signature = signature
+
+            compacted = None
+            for name, delta_signature in deltas[len(self._applied):]:
+                started = time.perf_counter()
+                delta = read_reviews(os.path.join(self.delta_dir, name))
+                self._dataset = self._dataset.with_delta(name, delta, time.perf_counter() - started)
+                self._applied.append((name, delta_signature))
+                if self._dataset.pending_deltas == 0:
+                    compacted = (self._dataset, list(self._applied))
+            if compacted is not None:
+                # Save the merged cube, so new processes only replay the deltas after it
+                dataset, applied = compacted
+                _write_prepared(dataset, signature, applied)
+            return self._dataset
+
+
+def default_data_path():
+    """
+    First of DATA_PATHS that exists (falls back to the pickle name for the error message).
+    """
+    for path in DATA_PATHS:
+        if os.path.exists(path):
+            return path
+    return DATA_PATHS[-1]
+
+
+@st.cache_resource(show_spinner=False)
+def get_data_store(path, backend=DEFAULT_BACKEND):
+    """
+    One DataStore per path for the whole server process (shared by all sessions).
+    """
+    return DataStore(path, backend)
+
+
+def get_dataset(path=None, backend=None):
+    """
+    Return the current LoadedDataset for `path`, reading it only if it changed.
+    Defaults to default_data_path() and the SM_BACKEND backend (else pandas).
+    """
+    return get_data_store(path or default_data_path(), backend or default_backend()).get()
+
+
+def default_backend():
+    return os.environ.get(BACKEND_ENV) or DEFAULT_BACKEND
+
+
+def read_daily_cube(path, backend=DEFAULT_BACKEND):
+    """
+    The daily cube of the dataset at `path` (see build_daily_cube), built with `backend`.
+    """
+    return BACKENDS[backend](path)[0]
+
+
+def read_reviews(path):
+    """
+    Read the review table from a columnar (memory-mapped) or pickle file,
+    keeping only DASHBOARD_COLUMNS (and COUNT_COLUMN), validated and cleaned by prepare_reviews.
+    """
+    return prepare_reviews(_read_columns(path))[0]
+
+
+def prepare_reviews(df):
+    """
+    Validate the review table and clean it, once at load. Returns (df, report).
+    - every DASHBOARD_COLUMNS column must be present, else DatasetError
+    - COUNT_COLUMN is kept when present; rows with a missing count stand for one review
+    - 'at' is coerced to datetime; unparseable values count as missing, and
+      timestamps written with UTC offsets are converted to UTC (see parse_timestamps)
+    - rows missing any REQUIRED_VALUES column are dropped (no view can place them)
+    - thumbsUpCount_222 is coerced to numbers; missing or unparseable counts become 0
+    The report holds rows_read, rows_kept, dropped (column -> rows) and filled
+    (column -> values). The cleaned table is in compact_reviews form.
+    """
+    check_columns(df.columns)
+    df = df[columns_to_read(df.columns)].copy(deep=False)
+    report = {'rows_read': len(df), 'dropped': {}, 'filled': {}}
+
+    if not pd.api.types.is_datetime64_any_dtype(df['at']):
+        df['at'] = parse_timestamps(df['at'])
+    thumbs = df['thumbsUpCount_222']
+    if not pd.api.types.is_numeric_dtype(thumbs):
+        thumbs = pd.to_numeric(thumbs, errors='coerce')
+    n_missing = int(thumbs.isna().sum())
+    if n_missing:
+        report['filled']['thumbsUpCount_222'] = n_missing
+        thumbs = thumbs.fillna(0)
+    df['thumbsUpCount_222'] = thumbs
+    if COUNT_COLUMN in df.columns:
+        df[COUNT_COLUMN] = pd.to_numeric(df[COUNT_COLUMN], errors='coerce').fillna(1).astype(np.int64)
+
+    keep = np.ones(len(df), dtype=bool)
+    for column in REQUIRED_VALUES:
+        missing = df[column].isna().to_numpy()
+        n_dropped = int((missing & keep).sum())
+        if n_dropped:
+            report['dropped'][column] = n_dropped
+        keep &= ~missing
+    if not keep.all():
+        df = df[keep]
+    report['rows_kept'] = len(df)
+    return compact_reviews(df), report
+
+
+def parse_timestamps(values):
+    """
+    `values` (strings or datetimes) as datetime64; unparseable values become NaT.
+    Timestamps that carry a UTC offset are converted to UTC, so the offsets may
+    differ from row to row (e.g. -05:00 and -04:00 across a DST change) and
+    every chunk of a file gets the same dtype whichever offsets it holds.
+    """
+    try:
+        parsed = pd.to_datetime(values, errors='coerce', format='mixed')
+    except ValueError:
+        # Mixed offsets (or offsets next to naive timestamps) only parse into one zone
+        parsed = pd.to_datetime(values, errors='coerce', format='mixed', utc=True)
+    if parsed.dt.tz is not None:
+        parsed = parsed.dt.tz_convert('UTC')
+    return parsed
+
+
+def check_columns(columns):
+    missing = [column for column in DASHBOARD_COLUMNS if column not in columns]
+    if missing:
+        raise DatasetError(f"The dataset is missing required column(s): {', '.join(missing)}")
+
+
+def compact_reviews(df):
+    """
+    Return the review table in its compact in-memory form:
+    - CATEGORICAL_COLUMNS as categoricals whose categories are sorted, so the
+      category list doubles as the vocabulary and filters/groupbys use int codes
+    - thumbsUpCount_222 in the narrowest integer dtype that holds it
+      (left as float when it has missing or fractional values, which must not be truncated)
+    - 'at' as datetime64
+    """
+    df = categorize_columns(df)
+
+    thumbs = df['thumbsUpCount_222']
+    if pd.api.types.is_integer_dtype(thumbs) or (not thumbs.isna().any() and (thumbs % 1 == 0).all()):
+        df['thumbsUpCount_222'] = pd.to_numeric(thumbs.astype(np.int64), downcast='integer')
+    else:
+        df['thumbsUpCount_222'] = thumbs.astype(np.float64)
+
+    if not pd.api.types.is_datetime64_any_dtype(df['at']):
+        df['at'] = parse_timestamps(df['at'])
+    return df
+
+
+def categorize_columns(df):
+    """
+    Shallow copy of `df` with CATEGORICAL_COLUMNS as categoricals with sorted categories.
+    """
+    df = df.copy(deep=False)
+    for column in CATEGORICAL_COLUMNS:
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.cat.remove_unused_categories()
+            df[column] = values.cat.reorder_categories(sorted(values.cat.categories))
+        else:
+            df[column] = pd.Categorical(values, categories=sorted(values.dropna().unique()))
+    return df
+
+
+def prepared_dir_for(path):
+    """
+    Directory holding the prepared (validated and aggregated) form of the dataset at `path`.
+    Named after the full file name: the .pkl and .feather of a dataset are prepared separately.
+    """
+    return path + '.prepared'
+
+
+def write_snapshot(dataset, directory, **meta):
+    """
+    Write `dataset`'s aggregates (the cube in App order, one .npy file per
+    column, the date index arrays, vocabularies and validation report) as
+    snapshot `dataset.version` in `directory` and make it the current one. Snapshots are written under a
+    temporary name and renamed, so readers never see a partial one.
+    Extra keyword arguments are stored in its meta.json.
+    """
+    os.makedirs(directory, exist_ok=True)
+    snapshot = dataset.version
+    target = os.path.join(directory, snapshot)
+    if not os.path.isdir(target):
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=directory)
+        os.chmod(staging, 0o755)  # mkdtemp is owner-only; readers may run as other users
+        index = dataset.date_index
+        # In the order the partitions use, so readers slice the mapped columns as they are
+        cube = AppPartitions(dataset.cube).rows_by_app
+        encodings = _write_cube_columns(cube, os.path.join(staging, 'cube'))
+        np.save(os.path.join(staging, 'cum_sums.npy'), index.cum_sums)
+        np.save(os.path.join(staging, 'cum_counts.npy'), index.cum_counts)
+        np.save(os.path.join(staging, 'pair_apps.npy'), index.pair_app_codes)
+        np.save(os.path.join(staging, 'pair_clusters.npy'), index.pair_cluster_codes)
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump(dict(
+                meta,
+                format=SNAPSHOT_FORMAT,
+                version=dataset.version,
+                base_version=dataset.base_version,
+                deltas=list(dataset.deltas),
+                source=dataset.path,
+                validation=dataset.validation,
+                apps=index.apps,
+                clusters=index.clusters,
+                first_day=index.first_day,
+                columns=list(cube.columns),
+                encodings=encodings,
+            ), f)
+        os.rename(staging, target)
+
+    pointer = os.path.join(directory, f".{CURRENT_FILE}.tmp")
+    with open(pointer, 'w') as f:
+        f.write(snapshot)
+    os.replace(pointer, os.path.join(directory, CURRENT_FILE))
+    return snapshot
+
+
+def read_snapshot_meta(directory, snapshot):
+    with open(os.path.join(directory, snapshot, 'meta.json')) as f:
+        return json.load(f)
+
+
+def read_snapshot(directory, snapshot=None):
+    """
+    LoadedDataset backed by the files of `snapshot` (default: the current one).
+    The cube columns and date index arrays are memory-mapped read-only and used
+    without copying, so every process reading the same snapshot shares them.
+    """
+    started = time.perf_counter()
+    snapshot = snapshot or current_snapshot(directory)
+    path = os.path.join(directory, snapshot)
+    meta = read_snapshot_meta(directory, snapshot)
+    if meta.get('format') != SNAPSHOT_FORMAT:
+        raise DatasetError(f"Snapshot {path} was written in an older format; it has to be rebuilt")
+
+    cube = _read_cube_columns(os.path.join(path, 'cube'), meta['columns'], meta['encodings'])
+    date_index = DateRangeIndex.from_arrays(
+        np.load(os.path.join(path, 'cum_sums.npy'), mmap_mode='r'),
+        np.load(os.path.join(path, 'cum_counts.npy'), mmap_mode='r'),
+        meta['apps'],
+        meta['clusters'],
+        np.load(os.path.join(path, 'pair_apps.npy')),
+        np.load(os.path.join(path, 'pair_clusters.npy')),
+        meta['first_day'],
+    )
+    mapped_bytes = sum(entry.stat().st_size for entry in os.scandir(os.path.join(path, 'cube')))
+    mapped_bytes += sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+    return LoadedDataset(
+        meta['source'], meta['version'], time.perf_counter() - started, cube,
+        date_index=date_index, base_version=meta['base_version'], deltas=meta['deltas'],
+        mapped_bytes=mapped_bytes, validation=meta['validation'],
+    )
+
+
+def current_snapshot(directory):
+    """
+    Name of the current snapshot in `directory`, or None if there is none yet.
+    """
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def prune_snapshots(directory, keep=0):
+    """
+    Delete all but the current snapshot and the `keep` most recent other ones.
+    """
+    current = current_snapshot(directory)
+    snapshots = [
+        entry for entry in os.scandir(directory)
+        if entry.is_dir() and not entry.name.startswith('.') and entry.name != current
+    ]
+    snapshots.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in snapshots[keep:]:
+        # Processes that still map these files keep them alive until they re-read
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def delta_dir_for(path):
+    """
+    Directory holding the delta batches for the dataset at `path`.
+    """
+    return os.path.splitext(path)[0] + '.deltas'
+
+
+def append_reviews(df, path=None):
+    """
+    Publish a batch of new reviews as a delta file for the dataset at `path`.
+    The batch is validated and cleaned like the dataset itself (see prepare_reviews),
+    so a batch without the dashboard columns raises DatasetError here rather than
+    when it is merged. The file is written under a hidden temporary name and then
+    renamed, so a running dashboard never picks up a half-written batch.
+    Returns the file path.
+    """
+    reviews = prepare_reviews(df)[0]
+    directory = delta_dir_for(path or default_data_path())
+    os.makedirs(directory, exist_ok=True)
+    # Sortable by creation time, so batches are applied in the order they were written
+    name = f"{datetime.datetime.now():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}.feather"
+    temporary = os.path.join(directory, f".{name}.tmp")
+    write_columnar(reviews, temporary)
+    target = os.path.join(directory, name)
+    os.replace(temporary, target)
+    return target
+
+
+def write_columnar(df, path):
+    """
+    Write `df` as an uncompressed Arrow IPC (Feather v2) file, so that readers
+    can memory-map it and load individual columns.
+    """
+    feather.write_feather(df.reset_index(drop=True), path, compression='uncompressed')
+
+
+def _write_cube_columns(cube, directory):
+    """
+    Save each column of `cube` as `<column>.npy` in `directory` and return how
+    to decode the ones saved in another form: categorical columns are saved as
+    their codes ({'categories': [...]}), timezone-aware timestamps as naive UTC
+    ({'timezone': name}).
+    """
+    os.makedirs(directory)
+    encodings = {}
+    for column in cube.columns:
+        values = cube[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            encodings[column] = {'categories': list(values.cat.categories)}
+            values = values.cat.codes
+        elif isinstance(values.dtype, pd.DatetimeTZDtype):
+            encodings[column] = {'timezone': str(values.dt.tz)}
+            values = values.dt.tz_convert(None)
+        np.save(os.path.join(directory, f"{column}.npy"), values.to_numpy())
+    return encodings
+
+
+def _read_cube_columns(directory, columns, encodings):
+    """
+    The cube saved by _write_cube_columns, every column a read-only memory map of its file.
+    """
+    data = {}
+    for column in columns:
+        # A plain ndarray view of the map, so the frame's columns are not np.memmap
+        values = np.asarray(np.load(os.path.join(directory, f"{column}.npy"), mmap_mode='r'))
+        encoding = encodings.get(column, {})
+        if 'categories' in encoding:
+            values = pd.Categorical.from_codes(values, categories=encoding['categories'])
+        elif 'timezone' in encoding:
+            # Reinterpreting the UTC ticks keeps the map; tz_localize would copy them
+            dtype = pd.DatetimeTZDtype(np.datetime_data(values.dtype)[0], encoding['timezone'])
+            values = pd.Series(values.view(np.int64), copy=False).astype(dtype)
+        data[column] = values
+    # copy=False keeps every column a view of its map
+    return pd.DataFrame(data, copy=False)
+
+
+def _cube_bytes(cube):
+    """
+    Memory this process holds for `cube`: category labels and every column
+    that is not memory-mapped (see held_nbytes).
+    """
+    total = 0
+    for column in cube.columns:
+        values = cube[column].array
+        if isinstance(values, pd.Categorical):
+            total += held_nbytes(values.codes) + int(values.categories.memory_usage(deep=True))
+        elif isinstance(values, pd.arrays.DatetimeArray):
+            total += held_nbytes(values.asi8)
+        else:
+            total += held_nbytes(np.asarray(values))
+    return total
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _list_deltas(directory):
+    """
+    (file name, signature) of every delta file in `directory`, in application order.
+    """
+    try:
+        names = sorted(
+            name for name in os.listdir(directory)
+            if name.endswith(DELTA_SUFFIXES) and not name.startswith('.')
+        )
+    except FileNotFoundError:
+        return []
+    return [(name, _file_signature(os.path.join(directory, name))) for name in names]
+
+
+def _read_dataset(path, backend=DEFAULT_BACKEND, deltas=()):
+    """
+    LoadedDataset of the file at `path` plus the leading `deltas` ((name, signature)
+    in application order) its prepared artifact holds, if any.
+    """
+    signature = _file_signature(path)
+    directory = prepared_dir_for(path)
+    meta = _prepared_meta(directory)
+    applied = [] if meta is None else [(name, tuple(sig)) for name, sig in meta.get('delta_signatures', [])]
+    if meta is not None and deltas[:len(applied)] != applied:
+        # Holds a delta that was removed or rewritten since: prepare the base file again
+        meta, applied = None, []
+    if meta is not None and meta.get('source_signature') == list(signature):
+        dataset = _read_prepared(directory, meta)
+        if dataset is not None:
+            return dataset
+
+    version = _file_hash(path)
+    if meta is not None and meta['base_version'] == version:
+        # Touched but unchanged: reuse the artifact and remember the new signature
+        dataset = _read_prepared(directory, meta)
+        if dataset is not None:
+            _write_prepared(dataset, signature, applied, replace=True)
+            return dataset
+
+    started = time.perf_counter()
+    cube, validation = BACKENDS[backend](path)
+    load_seconds = time.perf_counter() - started
+    dataset = LoadedDataset(path, version, load_seconds, cube, validation=validation)
+    _write_prepared(dataset, signature, replace=meta is not None and meta['version'] == version)
+    return dataset
+
+
+def _prepared_meta(directory):
+    """
+    meta.json of the current prepared artifact in `directory`, None if there is no usable one.
+    """
+    try:
+        snapshot = current_snapshot(directory)
+        if snapshot is None:
+            return None
+        meta = read_snapshot_meta(directory, snapshot)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get('format') == SNAPSHOT_FORMAT else None
+
+
+def _read_prepared(directory, meta):
+    try:
+        return read_snapshot(directory, meta['version'])
+    except (OSError, ValueError, KeyError):
+        # Unreadable or incomplete artifact: build it again
+        return None
+
+
+def _write_prepared(dataset, signature, applied=(), replace=False):
+    """
+    Save `dataset` as the prepared artifact of its file (with `signature`);
+    `applied` are the (name, signature) of the deltas merged into it.
+    """
+    directory = prepared_dir_for(dataset.path)
+    try:
+        if replace:
+            # Same content, new signature: write_snapshot keeps existing snapshots as they are
+            shutil.rmtree(os.path.join(directory, dataset.version), ignore_errors=True)
+        write_snapshot(dataset, directory, source_signature=list(signature),
+                       delta_signatures=[[name, list(sig)] for name, sig in applied])
+        prune_snapshots(directory)
+    except OSError:
+        # E.g. a read-only data directory: the next start just prepares again
+        pass
+
+
+def _read_columns(path):
+    if path.endswith(COLUMNAR_SUFFIXES):
+        table = feather.read_table(path, memory_map=True)
+        check_columns(table.column_names)
+        return table.select(columns_to_read(table.column_names)).to_pandas()
+    return pd.read_pickle(path)
+
+
+def columns_to_read(columns):
+    """
+    The columns of a file with `columns` that are loaded: DASHBOARD_COLUMNS plus COUNT_COLUMN if present.
+    """
+    return DASHBOARD_COLUMNS + [COUNT_COLUMN] * (COUNT_COLUMN in columns)
+
+
+def _load_with_pandas(path):
+    # The rows are only needed to build the cube; they are released on return
+    df, validation = prepare_reviews(_read_columns(path))
+    return build_daily_cube(df), validation
+
+
+def _load_with_duckdb(path):
+    check_columns(duckdb_backend.column_names(path))
+    cube, validation = duckdb_backend.daily_cube(path)
+    return with_day_numbers(categorize_columns(cube)), validation
+
+
+# name -> function(path) returning (daily cube, validation report)
+BACKENDS = {
+    'pandas': _load_with_pandas,
+    'duckdb': _load_with_duckdb,
+}
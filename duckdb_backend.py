@@ -0,0 +1,115 @@
+"""
+Daily cube computed by DuckDB, for datasets that do not fit in memory.
+
+With SM_BACKEND=duckdb the review rows are never loaded into pandas: DuckDB
+runs the build_daily_cube GROUP BY directly over the columnar file, streaming
+only the columns it needs, and just the aggregated cube comes back into Python.
+Every tab is answered from that cube, so nothing else touches the rows.
+The prepare_reviews cleaning rules are applied in SQL on the way.
+
+Needs the optional `duckdb` package and a columnar dataset: `.feather` /
+`.arrow` (see convert_dataset.py) or `.parquet`.
+"""
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as pa_dataset
+
+try:
+    import duckdb
+except ImportError:  # optional: only needed for SM_BACKEND=duckdb
+    duckdb = None
+
+SUPPORTED_SUFFIXES = ('.feather', '.arrow', '.parquet')
+
+# prepare_reviews's coercions: unparseable values become NULL
+CLEAN_VIEW = """
+CREATE VIEW cleaned AS
+SELECT {at} AS "at", "App", "appVersion", "kmeans_cluster_name", {thumbs} AS "thumbsUpCount_222",
+    {count} AS "n_reviews"
+FROM reviews
+"""
+
+CUBE_QUERY = """
+SELECT
+    date_trunc('day', "at") AS "at",
+    "App",
+    "appVersion",
+    "kmeans_cluster_name",
+    CAST(coalesce(sum("thumbsUpCount_222"), 0) AS {value_type}) AS "thumbsUpCount_222",
+    CAST(sum("n_reviews") AS BIGINT) AS "n_reviews",
+    coalesce(bool_and("thumbsUpCount_222" = floor("thumbsUpCount_222")), true) AS "whole"
+FROM cleaned
+WHERE "at" IS NOT NULL AND "App" IS NOT NULL AND "kmeans_cluster_name" IS NOT NULL
+GROUP BY ALL
+ORDER BY "at"
+"""
+
+REPORT_QUERY = """
+SELECT
+    count(*),
+    count(*) FILTER (WHERE "at" IS NULL),
+    count(*) FILTER (WHERE "at" IS NOT NULL AND "App" IS NULL),
+    count(*) FILTER (WHERE "at" IS NOT NULL AND "App" IS NOT NULL AND "kmeans_cluster_name" IS NULL),
+    count(*) FILTER (WHERE "thumbsUpCount_222" IS NULL)
+FROM cleaned
+"""
+
+
+def column_names(path):
+    return _open(path).schema.names
+
+
+def daily_cube(path):
+    """
+    (cube, validation report) as build_daily_cube / prepare_reviews would give
+    them for the same file (thumbsUpCount_222 included: int64 unless a review has
+    a fractional count), except that the cube has no 'day' column and its
+    App / appVersion / kmeans_cluster_name columns are plain strings.
+    """
+    reviews = _open(path)
+    at_type = reviews.schema.field('at').type
+    thumbs_type = reviews.schema.field('thumbsUpCount_222').type
+    timezone = getattr(at_type, 'tz', None)
+    numeric = pa.types.is_integer(thumbs_type) or pa.types.is_floating(thumbs_type)
+    clean_view = CLEAN_VIEW.format(
+        at='"at"' if pa.types.is_timestamp(at_type) else 'TRY_CAST("at" AS TIMESTAMP)',
+        thumbs='"thumbsUpCount_222"' if numeric else 'TRY_CAST("thumbsUpCount_222" AS DOUBLE)',
+        # Pre-aggregated files (see build_cube.py) say how many reviews each row stands for
+        count='coalesce(TRY_CAST("n_reviews" AS BIGINT), 1)' if 'n_reviews' in reviews.schema.names else '1',
+    )
+    value_type = 'BIGINT' if pa.types.is_integer(thumbs_type) else 'DOUBLE'
+
+    with duckdb.connect() as connection:
+        if timezone:
+            # Days are cut at local midnight of the data's own time zone, as in pandas
+            connection.execute(f"SET TimeZone = '{timezone}'")
+        connection.register('reviews', reviews)
+        connection.execute(clean_view)
+        cube = connection.execute(CUBE_QUERY.format(value_type=value_type)).fetch_arrow_table().to_pandas()
+        rows_read, no_at, no_app, no_cluster, no_thumbs = connection.execute(REPORT_QUERY).fetchone()
+
+    # prepare_reviews keeps counts as integers unless some review has a fractional one
+    whole = cube.pop('whole').all()
+    if whole and value_type == 'DOUBLE':
+        cube['thumbsUpCount_222'] = cube['thumbsUpCount_222'].astype(np.int64)
+    if timezone:
+        cube['at'] = cube['at'].dt.tz_convert(timezone)
+    dropped = {'at': no_at, 'App': no_app, 'kmeans_cluster_name': no_cluster}
+    report = {
+        'rows_read': rows_read,
+        'dropped': {column: n for column, n in dropped.items() if n},
+        'filled': {'thumbsUpCount_222': no_thumbs} if no_thumbs else {},
+        'rows_kept': rows_read - sum(dropped.values()),
+    }
+    return cube, report
+
+
+def _open(path):
+    if duckdb is None:
+        raise ImportError("The duckdb backend needs the optional 'duckdb' package (pip install duckdb)")
+    if not path.endswith(SUPPORTED_SUFFIXES):
+        raise ValueError(
+            f"The duckdb backend reads {', '.join(SUPPORTED_SUFFIXES)} files, not {path!r}; "
+            f"convert it with convert_dataset.py"
+        )
+    return pa_dataset.dataset(path, format='parquet' if path.endswith('.parquet') else 'ipc')
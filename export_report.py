@@ -0,0 +1,192 @@
+"""
+Render every dashboard view to files, without Streamlit.
+
+    python export_report.py --output report/ --window 2024-01-01:2024-03-31 2024-04-01:2024-06-30
+
+For the full date range ("all") and each --window START:END (inclusive) this writes
+- overview/: the Tab 1-2 summation and row-wise % heatmaps and the Tab 4 SWOT /
+  strength heatmaps
+- apps/<App>/: the Tab 5 monthly, weekly and daily charts and the Tab 6 appVersion
+  summation and row-wise % heatmaps, for every App
+as HTML (interactive, plotly.js from the CDN) and/or Plotly JSON; png/svg also
+work when the optional `kaleido` package is installed. The figures come from
+the same create_* functions as the dashboard. Work is split into one job per
+(window, App) and spread over a process pool; the dataset is loaded once, with
+its delta batches merged in exactly as the dashboard does, and its cube and date
+index are handed to every worker. A manifest.json lists everything that was written.
+"""
+import argparse
+import datetime
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from app import (create_appversion_percentage_heatmap, create_appversion_summation_heatmap,
+                 create_inter_app_strength_heatmap, create_intra_app_swot_heatmap,
+                 create_percentage_heatmap_from_table, create_summation_heatmap_from_table,
+                 create_time_scatter_plot_from_series)
+from aggregates import TIME_BUCKETS, AppPartitions, time_bucket_sums
+from data_store import BACKENDS, DataStore, default_backend, default_data_path
+from pivots import PivotMatrix
+
+FORMATS = ('html', 'json', 'png', 'svg')
+IMAGE_FORMATS = ('png', 'svg')
+
+# Set in each worker by _init_worker
+_date_index = None
+_partitions = None
+
+
+def parse_window(text):
+    """
+    'START:END' (ISO dates, both inclusive) -> (label, start, end).
+    """
+    try:
+        start, end = (datetime.date.fromisoformat(part) for part in text.split(':'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected START:END as ISO dates, got {text!r}")
+    if start > end:
+        raise argparse.ArgumentTypeError(f"window {text!r} ends before it starts")
+    return (f"{start}_{end}", start, end)
+
+
+def overview_figures(start_date, end_date):
+    """
+    Tabs 1, 2 and 4 for one date window.
+    """
+    table = _date_index.query(start_date, end_date)
+    swot_table = PivotMatrix.from_table(table).swot()
+    return {
+        'summation': create_summation_heatmap_from_table(table),
+        'percentage': create_percentage_heatmap_from_table(table),
+        'swot': create_intra_app_swot_heatmap(swot_table),
+        'strength': create_inter_app_strength_heatmap(swot_table),
+    }
+
+
+def app_figures(app, start_date, end_date):
+    """
+    Tabs 5 and 6 for one App and date window (None where the App has no reviews).
+    """
+    rows = _partitions.rows(app)
+    rows = rows[_in_window(rows['at'], start_date, end_date)]
+    series = time_bucket_sums(rows, buckets=TIME_BUCKETS)
+    return {
+        'monthly': create_time_scatter_plot_from_series(series['month'], 'month'),
+        'weekly': create_time_scatter_plot_from_series(series['week'], 'week'),
+        'daily': create_time_scatter_plot_from_series(series['day'], 'day'),
+        'appversion_summation': create_appversion_summation_heatmap(rows) if len(rows) else None,
+        'appversion_percentage': create_appversion_percentage_heatmap(rows) if len(rows) else None,
+    }
+
+
+def run_job(job):
+    """
+    Build and write the figures of one job; returns manifest entries for them.
+    """
+    window, start_date, end_date, app, directory, formats = job
+    if app is None:
+        figures = overview_figures(start_date, end_date)
+    else:
+        figures = app_figures(app, start_date, end_date)
+
+    os.makedirs(directory, exist_ok=True)
+    entries = []
+    for view, fig in figures.items():
+        if fig is None:
+            continue
+        for fmt in formats:
+            path = os.path.join(directory, f"{view}.{fmt}")
+            write_figure(fig, path, fmt)
+            entries.append({'window': window, 'app': app, 'view': view, 'format': fmt, 'path': path})
+    return entries
+
+
+def write_figure(fig, path, fmt):
+    if fmt == 'html':
+        fig.write_html(path, include_plotlyjs='cdn', full_html=True)
+    elif fmt == 'json':
+        with open(path, 'w') as f:
+            f.write(fig.to_json())
+    else:
+        fig.write_image(path, format=fmt)
+
+
+def make_jobs(apps, windows, output, formats):
+    jobs = []
+    for window, start_date, end_date in windows:
+        jobs.append((window, start_date, end_date, None, os.path.join(output, window, 'overview'), formats))
+        for app in apps:
+            directory = os.path.join(output, window, 'apps', _file_name(app))
+            jobs.append((window, start_date, end_date, app, directory, formats))
+    return jobs
+
+
+def _init_worker(cube, date_index):
+    global _date_index, _partitions
+    _date_index = date_index
+    _partitions = AppPartitions(cube)
+
+
+def _in_window(timestamps, start_date, end_date):
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_localize(None)
+    return (timestamps >= pd.Timestamp(start_date)) & (timestamps < pd.Timestamp(end_date) + pd.Timedelta(days=1))
+
+
+def _file_name(value):
+    return re.sub(r'[^\w.-]+', '_', str(value)).strip('_') or '_'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export every dashboard view as static files.")
+    parser.add_argument('--data', default=None, help="Dataset to read (default: the one the dashboard uses).")
+    parser.add_argument('--output', default='report', help="Directory to write the report into.")
+    parser.add_argument('--window', type=parse_window, nargs='*', default=[], metavar='START:END',
+                        help="Extra date windows, e.g. 2024-01-01:2024-03-31 (the full range is always exported).")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default=default_backend(),
+                        help="How to build the daily cube (default: SM_BACKEND, else pandas).")
+    parser.add_argument('--apps', nargs='+', help="Only export these Apps (default: all).")
+    parser.add_argument('--format', nargs='+', choices=FORMATS, default=['html'], dest='formats')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="Worker processes (default: one per CPU).")
+    args = parser.parse_args()
+
+    if set(args.formats) & set(IMAGE_FORMATS):
+        try:
+            import kaleido  # noqa: F401
+        except ImportError:
+            parser.error("png/svg export needs the optional 'kaleido' package (pip install kaleido)")
+
+    started = time.perf_counter()
+    # Same dataset as the dashboard: base file (or its prepared artifact) plus every delta batch
+    dataset = DataStore(args.data or default_data_path(), args.backend).get()
+    cube = dataset.cube
+    if cube.empty:
+        parser.error("the dataset has no reviews")
+    apps = args.apps or list(cube['App'].cat.categories)
+    windows = [('all', cube['at'].min().date(), cube['at'].max().date())] + args.window
+    jobs = make_jobs(apps, windows, args.output, tuple(args.formats))
+
+    manifest = []
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(cube, dataset.date_index)) as pool:
+        for entries in pool.map(run_job, jobs):
+            manifest.extend(entries)
+
+    os.makedirs(args.output, exist_ok=True)
+    with open(os.path.join(args.output, 'manifest.json'), 'w') as f:
+        json.dump({
+            'windows': [{'name': name, 'start': str(start), 'end': str(end)} for name, start, end in windows],
+            'apps': [str(app) for app in apps],
+            'files': manifest,
+        }, f, indent=2)
+    print(f"Wrote {len(manifest):,} files for {len(apps)} Apps x {len(windows)} windows to {args.output} "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
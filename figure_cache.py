@@ -0,0 +1,149 @@
+"""
+Process-wide LRU cache of finished Plotly figures.
+
+Most reruns ask for a figure that some session has already built: the
+full-data heatmaps, popular Apps in Tabs 5/6, common date ranges. Figures are
+cached under (view, parameters...) together with the dataset version. Entries
+of the KEEP_VERSIONS most recently requested versions are kept side by side, so
+a session still rendering the previous version does not flush the figures of
+sessions already on the new one; older versions are dropped.
+
+Memory is bounded both by entry count and by the estimated size of the cached
+figures, evicting the least recently used first.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import streamlit as st
+
+DEFAULT_MAX_ENTRIES = 128
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Dataset versions whose figures are kept at the same time
+KEEP_VERSIONS = 2
+
+_MISSING = object()
+
+
+class FigureCache:
+    """
+    Thread-safe LRU of figures with hit/miss/eviction counters.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size_bytes = 0
+        self._entries = OrderedDict()
+        self._versions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, version, build):
+        """
+        Return the figure cached under `key` for data `version`, calling
+        `build()` to create (and cache) it on a miss. `build` may return None.
+        """
+        entry_key = (version, key)
+        with self._lock:
+            self._use_version(version)
+            entry = self._entries.get(entry_key, _MISSING)
+            if entry is not _MISSING:
+                self._entries.move_to_end(entry_key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Build outside the lock so other sessions are not blocked meanwhile
+        fig = build()
+        size = figure_size_bytes(fig)
+
+        with self._lock:
+            if version not in self._versions or size > self.max_bytes:
+                return fig
+            if entry_key in self._entries:
+                self.size_bytes -= self._entries.pop(entry_key)[1]
+            self._entries[entry_key] = (fig, size)
+            self.size_bytes += size
+            while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size_bytes -= evicted_size
+                self.evictions += 1
+        return fig
+
+    def peek(self, key, version):
+        """
+        (True, figure) if `key` is cached for data `version`, else (False, None).
+        Counts as a hit (and refreshes the entry) when found; misses are not counted.
+        """
+        with self._lock:
+            entry = self._entries.get((version, key), _MISSING)
+            if entry is _MISSING:
+                return False, None
+            self._entries.move_to_end((version, key))
+            self.hits += 1
+            return True, entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'size_bytes': self.size_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def _clear(self):
+        self._entries.clear()
+        self._versions.clear()
+        self.size_bytes = 0
+
+    def _use_version(self, version):
+        self._versions[version] = True
+        self._versions.move_to_end(version)
+        while len(self._versions) > KEEP_VERSIONS:
+            dropped, _ = self._versions.popitem(last=False)
+            for entry_key in [k for k in self._entries if k[0] == dropped]:
+                self.size_bytes -= self._entries.pop(entry_key)[1]
+
+
+@st.cache_resource(show_spinner=False)
+def get_figure_cache():
+    """
+    The FigureCache shared by all sessions of this server process.
+    """
+    return FigureCache()
+
+
+def figure_size_bytes(fig):
+    """
+    Estimated size of the figure's spec, i.e. roughly what gets sent to the
+    browser, from its trace arrays and layout without serializing it (that
+    would cost as much as the serialization Streamlit does anyway).
+    """
+    if fig is None:
+        return 0
+    return sum(_value_bytes(trace) for trace in fig._data) + _value_bytes(fig._layout)
+
+
+def _value_bytes(value):
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == 'O':
+            return sum(_value_bytes(item) + 1 for item in value.ravel())
+        # Numeric arrays are sent base64-encoded
+        return value.nbytes * 4 // 3
+    if isinstance(value, str):
+        return len(value) + 2
+    if isinstance(value, dict):
+        return sum(len(name) + 4 + _value_bytes(item) for name, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(_value_bytes(item) + 1 for item in value)
+    return 8
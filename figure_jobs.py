@@ -0,0 +1,213 @@
+"""
+Build figures on a background thread pool and show each one as soon as it is ready.
+
+chart_slot() reserves a chart's place on the page with a placeholder and starts
+building its figure in the background (unless it is in the figure cache);
+fill_slots() then waits and shows every figure the moment it completes, in
+completion order rather than page order. While waiting, the placeholders show
+the elapsed time; those updates also give Streamlit the chance to stop a stale
+run as soon as the user changes a widget.
+
+Each session remembers which figure every slot is waiting for. When a rerun
+asks a slot for a different figure (e.g. the date range moved), or no longer
+shows the slot at all (e.g. a granularity was removed or another tab opened),
+the old request is released and, if no other session wants it and it has not
+started yet, cancelled, so dragging a date input does not queue up obsolete
+builds. Builds that are already running finish and land in the figure cache.
+
+Inputs that several figures of a run share (e.g. one pass over an App's rows)
+go through once(), so concurrent builds compute them a single time.
+"""
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+import streamlit as st
+
+import profiling
+from figure_cache import get_figure_cache
+
+DEFAULT_MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+# Seconds between elapsed-time updates of the placeholders still waiting
+PROGRESS_INTERVAL = 0.5
+
+_SLOTS_KEY = '_figure_slots'
+
+# Chart keys asked for by chart_slot() since the last fill_slots()
+_CLAIMED_KEY = '_figure_slots_claimed'
+
+
+class FigureWorkers:
+    """
+    Process-wide pool of figure builds. Requests for the same (version, key)
+    share one build; a build is cancelled when every requester released it
+    before it started.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='figure')
+        self._lock = threading.RLock()
+        self._pending = {}
+
+    def submit(self, version, key, build):
+        """
+        Future of the figure for `key` at data `version`, built through the figure cache.
+        """
+        request = (version, key)
+        with self._lock:
+            entry = self._pending.get(request)
+            if entry is not None:
+                entry[1] += 1
+                return entry[0]
+            # Keep the caller's profiling context, so the build's stages are recorded
+            context = contextvars.copy_context()
+            future = self._executor.submit(context.run, get_figure_cache().get_or_build, key, version, build)
+            self._pending[request] = [future, 1]
+        future.add_done_callback(lambda _, request=request: self._forget(request))
+        return future
+
+    def release(self, version, key):
+        """
+        The caller no longer waits for this figure.
+        """
+        with self._lock:
+            entry = self._pending.get((version, key))
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] <= 0:
+                entry[0].cancel()
+
+    def stats(self):
+        with self._lock:
+            return {'pending': len(self._pending)}
+
+    def _forget(self, request):
+        with self._lock:
+            self._pending.pop(request, None)
+
+
+@st.cache_resource(show_spinner=False)
+def get_figure_workers():
+    """
+    The FigureWorkers shared by all sessions of this server process.
+    """
+    return FigureWorkers()
+
+
+class ChartSlot:
+    """
+    A reserved place on the page and the figure that will go there.
+    """
+
+    def __init__(self, placeholder, future, chart_key, empty_message):
+        self.placeholder = placeholder
+        self.future = future
+        self.chart_key = chart_key
+        self.empty_message = empty_message
+        self.progress = None
+
+    def show(self):
+        try:
+            fig = self.future.result()
+        except Exception as exc:
+            self.placeholder.exception(exc)
+            return
+        if fig is None:
+            if self.empty_message:
+                self.placeholder.warning(self.empty_message)
+            else:
+                self.placeholder.empty()
+            return
+        with profiling.stage('serialize'):
+            self.placeholder.plotly_chart(fig, width="stretch", key=self.chart_key)
+
+    def show_progress(self, seconds):
+        progress = int(seconds)
+        if progress != self.progress:
+            self.progress = progress
+            self.placeholder.info(f"Building chart... {progress}s" if progress else "Building chart...")
+
+
+def chart_slot(dataset, key, build, chart_key, empty_message=None):
+    """
+    Reserve the place of chart `chart_key` here and start building its figure.
+    `key` / `build` are as for the figure cache: the key must capture every
+    input of `build` other than the dataset. `empty_message` is shown instead
+    of the chart when `build` returns None.
+    """
+    placeholder = st.empty()
+    request = (dataset.version, key)
+    slots = st.session_state.setdefault(_SLOTS_KEY, {})
+    previous = slots.get(chart_key)
+
+    found, fig = get_figure_cache().peek(key, dataset.version)
+    if found:
+        future = Future()
+        future.set_result(fig)
+    elif previous is not None and previous[0] == request and not previous[1].done():
+        # Same figure as the interrupted run was waiting for: keep waiting for it
+        future = previous[1]
+    else:
+        future = get_figure_workers().submit(dataset.version, key, build)
+
+    if previous is not None and previous[0] != request and not previous[1].done():
+        get_figure_workers().release(*previous[0])
+    slots[chart_key] = (request, future)
+    st.session_state.setdefault(_CLAIMED_KEY, set()).add(chart_key)
+
+    slot = ChartSlot(placeholder, future, chart_key, empty_message)
+    if not future.done():
+        slot.show_progress(0)
+    return slot
+
+
+def fill_slots(slots):
+    """
+    Show every slot's chart as soon as its figure is ready. Called once per run
+    with all of its slots (an empty list when the run shows no charts): slots of
+    earlier runs that this run did not ask for again are released first.
+    """
+    _release_unclaimed()
+    waiting = list(slots)
+    started = time.perf_counter()
+    while waiting:
+        wait({slot.future for slot in waiting}, timeout=PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+        elapsed = time.perf_counter() - started
+        still_waiting = []
+        for slot in waiting:
+            if slot.future.done():
+                slot.show()
+            else:
+                slot.show_progress(elapsed)
+                still_waiting.append(slot)
+        waiting = still_waiting
+
+
+def once(build):
+    """
+    `build` (no arguments) wrapped to run at most once, however many figure
+    builds call it at the same time: the others wait for its result.
+    """
+    lock = threading.Lock()
+    result = []
+
+    def call():
+        with lock:
+            if not result:
+                result.append(build())
+            return result[0]
+    return call
+
+
+def _release_unclaimed():
+    slots = st.session_state.setdefault(_SLOTS_KEY, {})
+    claimed = st.session_state.get(_CLAIMED_KEY, set())
+    for chart_key in [key for key in slots if key not in claimed]:
+        request, future = slots.pop(chart_key)
+        if not future.done():
+            get_figure_workers().release(*request)
+    st.session_state[_CLAIMED_KEY] = set()
@@ -0,0 +1,150 @@
+"""
+One NumPy-backed pivot for every heatmap in the dashboard.
+
+All heatmaps are views of the same kind of matrix: thumbsUpCount_222 summed
+over (row key x kmeans_cluster_name). PivotMatrix builds that matrix with a
+single scatter-add and derives the normalised views from it:
+- raw():      the sums
+- row_pct():  each row sums to 100%
+- swot():     column % of the row % table, each column sums to 100% (Tab 4 top)
+- strength(): row % of the SWOT table, each row sums to 100% (Tab 4 bottom)
+Rows or columns whose total is 0 come out as 0% instead of NaN/inf.
+delta() compares two matrices (e.g. two date periods) in any of these views.
+"""
+import numpy as np
+import pandas as pd
+
+import profiling
+
+# Views delta() can compare: sums, then the percentage views derived from them
+VIEWS = ('raw', 'row_pct', 'swot', 'strength')
+
+
+class PivotMatrix:
+    """
+    Dense sums matrix with its row and column labels.
+    Build it with from_frame() (review rows or the daily cube) or from_table()
+    (an already summed DataFrame, e.g. a DateRangeIndex query).
+    """
+
+    def __init__(self, values, index, columns):
+        self.values = values
+        self.index = index
+        self.columns = columns
+
+    @classmethod
+    @profiling.timed('aggregate')
+    def from_frame(cls, df, index='App', columns='kmeans_cluster_name', value='thumbsUpCount_222'):
+        """
+        Sum `value` over (`index`, `columns`) like groupby().sum().pivot().fillna(0).
+        Only keys that occur in `df` get a row/column; rows with a missing key are ignored.
+        """
+        row_codes, row_labels = pd.factorize(df[index], sort=True)
+        col_codes, col_labels = pd.factorize(df[columns], sort=True)
+        n_rows, n_cols = len(row_labels), len(col_labels)
+
+        present = (row_codes >= 0) & (col_codes >= 0)
+        flat = row_codes[present] * n_cols + col_codes[present]
+        weights = df[value].to_numpy()[present]
+        sums = np.bincount(flat, weights=np.nan_to_num(weights.astype(np.float64)), minlength=n_rows * n_cols)
+        if pd.api.types.is_integer_dtype(df[value]):
+            sums = sums.astype(np.int64)
+
+        return cls(
+            sums.reshape(n_rows, n_cols),
+            pd.Index(list(row_labels), name=index),
+            pd.Index(list(col_labels), name=columns),
+        )
+
+    @classmethod
+    def from_table(cls, table):
+        """
+        Wrap an existing sums DataFrame (no copy when its columns share one dtype).
+        """
+        return cls(table.to_numpy(), table.index, table.columns)
+
+    def overview(self, max_rows):
+        """
+        At most `max_rows` rows: the largest rows by total, in their original
+        order, plus one "Other (N rows)" row holding the sum of all the rest.
+        """
+        if len(self.index) <= max_rows:
+            return self
+        totals = self.values.sum(axis=1)
+        keep = np.sort(np.argsort(-totals, kind='stable')[:max_rows - 1])
+        rest = np.ones(len(totals), dtype=bool)
+        rest[keep] = False
+        values = np.vstack([self.values[keep], self.values[rest].sum(axis=0, keepdims=True)])
+        index = pd.Index(list(self.index[keep]) + [f"Other ({rest.sum()} rows)"], name=self.index.name)
+        return PivotMatrix(values, index, self.columns)
+
+    def row_slice(self, start, stop):
+        """
+        Rows [start, stop) only, for drilling into one page of a large matrix.
+        """
+        return PivotMatrix(self.values[start:stop], self.index[start:stop], self.columns)
+
+    def reindexed(self, index, columns):
+        """
+        Matrix over `index` x `columns` (supersets of this one's labels), new cells 0.
+        """
+        values = np.zeros((len(index), len(columns)), dtype=self.values.dtype)
+        values[np.ix_(index.get_indexer(self.index), columns.get_indexer(self.columns))] = self.values
+        return PivotMatrix(values, index, columns)
+
+    def aligned(self, other):
+        """
+        (self, other) both reindexed to the union of their row and column labels.
+        """
+        index = self.index.union(other.index)
+        columns = self.columns.union(other.columns)
+        return self.reindexed(index, columns), other.reindexed(index, columns)
+
+    @profiling.timed('aggregate')
+    def delta(self, other, view='raw'):
+        """
+        `other` minus this matrix in `view` (one of VIEWS), on the union of their
+        rows and columns: the change in sums for 'raw', in percentage points for
+        the percentage views. Each side's percentages are of its own totals.
+        """
+        if view not in VIEWS:
+            raise ValueError(f"unknown view {view!r}, expected one of {VIEWS}")
+        before, after = self.aligned(other)
+        return after._frame(getattr(after, view)().to_numpy() - getattr(before, view)().to_numpy())
+
+    def raw(self):
+        return self._frame(self.values)
+
+    def row_pct(self):
+        return self._frame(row_percentages(self.values))
+
+    def swot(self):
+        return self._frame(column_percentages(row_percentages(self.values)))
+
+    def strength(self):
+        return self._frame(row_percentages(column_percentages(row_percentages(self.values))))
+
+    def _frame(self, values):
+        return pd.DataFrame(values, index=self.index, columns=self.columns, copy=False)
+
+
+def row_percentages(values):
+    """
+    Scale each row of `values` to sum to 100; all-zero rows stay 0.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    totals = values.sum(axis=1, keepdims=True)
+    pct = np.divide(values, totals, out=np.zeros_like(values), where=totals != 0)
+    pct *= 100
+    return pct
+
+
+def column_percentages(values):
+    """
+    Scale each column of `values` to sum to 100; all-zero columns stay 0.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    totals = values.sum(axis=0, keepdims=True)
+    pct = np.divide(values, totals, out=np.zeros_like(values), where=totals != 0)
+    pct *= 100
+    return pct
@@ -0,0 +1,234 @@
+"""
+Opt-in per-rerun profiling of the dashboard.
+
+Turn it on for the whole server with the SM_PROFILE=1 environment variable, or
+for one browser session by opening the app with `?profile=1` in the URL.
+
+While enabled, every script run (and every fragment rerun) records how long
+each stage took and how much the process RSS moved, grouped by tab:
+- load:      getting the shared dataset
+- filter:    selecting rows for the chosen App / clusters
+- aggregate: building sums tables (date-range queries, pivots, groupbys)
+- figure:    building Plotly figures
+- serialize: st.plotly_chart, i.e. figure -> JSON -> browser
+The breakdown is shown in a sidebar expander and logged as one JSON line per
+run on the `sm_listening.profile` logger, so it can be aggregated across sessions.
+
+When disabled, `stage()` and `timed()` cost one context-variable lookup.
+"""
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import time
+import uuid
+
+import streamlit as st
+
+ENV_VAR = 'SM_PROFILE'
+QUERY_PARAM = 'profile'
+
+logger = logging.getLogger('sm_listening.profile')
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+_current = contextvars.ContextVar('sm_listening_profile', default=None)
+_NULL_STAGE = contextlib.nullcontext()
+
+
+class RerunProfile:
+    """
+    Stage timings of one script or fragment run.
+    - records: list of (section, stage, seconds, rss_delta_bytes) in call order
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.section = name
+        self.records = []
+        self.started = time.perf_counter()
+        self.total_seconds = None
+
+    def summary(self):
+        """
+        Records merged per (section, stage): calls, total seconds, total RSS delta.
+        """
+        merged = {}
+        for section, stage, seconds, rss_delta in self.records:
+            entry = merged.setdefault((section, stage), [0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] += rss_delta or 0
+        return [
+            {'section': section, 'stage': stage, 'calls': calls, 'seconds': seconds, 'rss_delta_bytes': rss_delta}
+            for (section, stage), (calls, seconds, rss_delta) in merged.items()
+        ]
+
+
+class _Stage:
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.rss = process_rss_bytes()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.started
+        rss = process_rss_bytes()
+        rss_delta = rss - self.rss if rss is not None and self.rss is not None else None
+        self.profile.records.append((self.profile.section, self.name, seconds, rss_delta))
+        return False
+
+
+def is_enabled():
+    if os.environ.get(ENV_VAR, '') not in ('', '0'):
+        return True
+    try:
+        return st.query_params.get(QUERY_PARAM) == '1'
+    except Exception:
+        # No Streamlit session, e.g. when the chart functions are used from scripts
+        return False
+
+
+@contextlib.contextmanager
+def rerun(name):
+    """
+    Profile everything inside as one run called `name`, if profiling is enabled.
+    Inside an already profiled run this just switches the section to `name`.
+    """
+    profile = _current.get()
+    if profile is not None:
+        with section(name):
+            yield profile
+        return
+    if not is_enabled():
+        yield None
+        return
+
+    profile = RerunProfile(name)
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+        profile.total_seconds = time.perf_counter() - profile.started
+        _publish(profile)
+
+
+@contextlib.contextmanager
+def section(name):
+    """
+    Attribute the stages inside to `name` (e.g. a tab) in the current profile.
+    """
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    previous = profile.section
+    profile.section = name
+    try:
+        yield
+    finally:
+        profile.section = previous
+
+
+def profiled_section(name):
+    """
+    Decorator form of rerun(name), for tab bodies: in a full script run the
+    stages count towards section `name`; when the function reruns on its own
+    as a fragment, it becomes a separately profiled run.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with rerun(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def stage(name):
+    """
+    Context manager timing one stage of the current profiled run (no-op when disabled).
+    """
+    profile = _current.get()
+    if profile is None:
+        return _NULL_STAGE
+    return _Stage(profile, name)
+
+
+def timed(name):
+    """
+    Decorator timing every call of the function as stage `name`.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = _current.get()
+            if profile is None:
+                return func(*args, **kwargs)
+            with _Stage(profile, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def render_sidebar():
+    """
+    Show the breakdown of this session's latest profiled run in the sidebar.
+    """
+    profile = st.session_state.get('_last_profile')
+    if profile is None:
+        return
+    with st.sidebar.expander("Profiling (last run)", expanded=True):
+        st.caption(f"{profile.name}: {profile.total_seconds * 1000:,.1f} ms total")
+        rows = [
+            {
+                'section': entry['section'],
+                'stage': entry['stage'],
+                'calls': entry['calls'],
+                'ms': round(entry['seconds'] * 1000, 2),
+                'RSS delta MB': round(entry['rss_delta_bytes'] / 1e6, 2),
+            }
+            for entry in profile.summary()
+        ]
+        st.dataframe(rows, hide_index=True)
+
+
+def process_rss_bytes():
+    """
+    Resident set size of this process in bytes, or None where /proc is unavailable.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE')
+
+
+def _publish(profile):
+    session_id = None
+    try:
+        st.session_state['_last_profile'] = profile
+        session_id = st.session_state.setdefault('_profile_session_id', uuid.uuid4().hex)
+    except Exception:
+        pass
+    logger.info(json.dumps({
+        'event': 'rerun_profile',
+        'session': session_id,
+        'run': profile.name,
+        'total_ms': round(profile.total_seconds * 1000, 3),
+        'rss_bytes': process_rss_bytes(),
+        'stages': [
+            dict(entry, seconds=round(entry['seconds'], 6)) for entry in profile.summary()
+        ],
+    }))
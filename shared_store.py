@@ -0,0 +1,135 @@
+"""
+Serve several dashboard processes from one copy of the aggregates.
+
+Normally every Streamlit server process loads the reviews and builds the daily
+cube and date index itself. With a shared store, one publisher process does
+that and writes the aggregates as memory-mappable files; dashboard workers
+attach to them read-only, so N workers on a host share one copy through the
+page cache instead of holding N copies:
+
+    python shared_store.py --store /dev/shm/sm_listening --watch 30
+    SM_SHARED_STORE=/dev/shm/sm_listening streamlit run app.py --server.port 8501
+    SM_SHARED_STORE=/dev/shm/sm_listening streamlit run app.py --server.port 8502
+
+(/dev/shm keeps the files in shared memory; any local directory works too.)
+With --watch the publisher keeps polling the dataset and its delta batches and
+publishes a new snapshot when they change; workers pick it up on their next rerun.
+
+Store layout: `CURRENT` names the live snapshot directory, which holds
+- cube/<column>.npy: the daily cube in App order, one array per column (categorical
+  columns as codes), which workers use in place without copying (see build_daily_cube)
+- cum_sums.npy, cum_counts.npy, pair_apps.npy, pair_clusters.npy: the DateRangeIndex arrays
+- meta.json: dataset version, vocabularies, validation report and load bookkeeping
+Snapshots are written under a temporary name and switched to atomically
+(see data_store.write_snapshot, which also writes the prepared artifacts).
+"""
+import argparse
+import os
+import threading
+import time
+
+import streamlit as st
+
+import data_store
+from data_store import (BACKENDS, DataStore, default_backend, default_data_path, get_dataset, prune_snapshots,
+                        read_snapshot, write_snapshot)
+
+ENV_VAR = 'SM_SHARED_STORE'
+
+# Snapshots kept besides the current one, for workers still reading the previous one
+KEEP_PREVIOUS = 1
+
+
+def serving_dataset():
+    """
+    The dataset this server process should show: attached from the shared
+    store when SM_SHARED_STORE is set, otherwise loaded in-process.
+    """
+    directory = os.environ.get(ENV_VAR)
+    if directory:
+        return get_shared_store(directory).get()
+    return get_dataset()
+
+
+class SharedStoreReader:
+    """
+    Keeps the dataset attached to the current snapshot of a store and
+    re-attaches when the publisher switches to a new one.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._dataset = None
+
+    def get(self):
+        snapshot = current_snapshot(self.directory)
+        with self._lock:
+            if snapshot != self._snapshot:
+                self._dataset = attach(self.directory, snapshot)
+                self._snapshot = snapshot
+            return self._dataset
+
+
+@st.cache_resource(show_spinner=False)
+def get_shared_store(directory):
+    """
+    One SharedStoreReader per store directory for the whole server process.
+    """
+    return SharedStoreReader(directory)
+
+
+def publish(dataset, directory):
+    """
+    Write `dataset`'s aggregates as a new snapshot in `directory` and make it
+    current. Returns the snapshot name (the dataset version).
+    """
+    snapshot = write_snapshot(dataset, directory, published_at=time.time())
+    prune_snapshots(directory, keep=KEEP_PREVIOUS)
+    return snapshot
+
+
+def attach(directory, snapshot=None):
+    """
+    LoadedDataset backed by the files of `snapshot` (default: the current one),
+    memory-mapped and shared with every other process attached to it.
+    """
+    return read_snapshot(directory, snapshot or current_snapshot(directory))
+
+
+def current_snapshot(directory):
+    snapshot = data_store.current_snapshot(directory)
+    if snapshot is None:
+        raise FileNotFoundError(
+            f"No published snapshot in {directory}; start `python shared_store.py --store {directory}` first"
+        )
+    return snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish the dashboard aggregates for SM_SHARED_STORE workers.")
+    parser.add_argument('--store', required=True, help="Directory to publish into, e.g. /dev/shm/sm_listening.")
+    parser.add_argument('--data', default=None, help="Dataset to read (default: the one the dashboard uses).")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default=default_backend(),
+                        help="How to build the aggregates (default: SM_BACKEND, else pandas).")
+    parser.add_argument('--watch', type=float, metavar='SECONDS',
+                        help="Keep running and republish when the dataset or its deltas change.")
+    args = parser.parse_args()
+
+    store = DataStore(args.data or default_data_path(), args.backend)
+    published = None
+    while True:
+        started = time.perf_counter()
+        dataset = store.get()
+        if dataset.version != published:
+            published = publish(dataset, args.store)
+            print(f"Published {published} ({len(dataset.cube):,} cube cells, {len(dataset.deltas)} deltas) "
+                  f"to {args.store} in {time.perf_counter() - started:.1f}s", flush=True)
+        if args.watch is None:
+            break
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    main()
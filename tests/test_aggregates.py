@@ -0,0 +1,95 @@
+import pandas as pd
+import pytest
+
+from aggregates import TIME_BUCKETS, DateRangeIndex, build_daily_cube, time_bucket_sums
+from benchmarks.synthetic import generate_reviews
+
+
+def _pivot(reviews, start, end):
+    days = reviews['at'].dt.floor('D')
+    rows = reviews[(days >= pd.Timestamp(start)) & (days <= pd.Timestamp(end))]
+    table = rows.pivot_table(index='App', columns='kmeans_cluster_name', values='thumbsUpCount_222',
+                             aggfunc='sum', fill_value=0, observed=True)
+    table.index, table.columns = table.index.astype(str), table.columns.astype(str)
+    return table
+
+
+def test_extending_the_same_index_twice_leaves_both_results_intact():
+    reviews = generate_reviews(20_000, n_apps=4, n_clusters=5, n_versions=3, n_days=90, seed=3)
+    days = (reviews['at'] - reviews['at'].min()).dt.days
+    # Both extensions add days after the last day of the index, one of them past the other
+    base, first, second = reviews[days < 70], reviews[(days >= 70) & (days < 80)], reviews[days >= 75]
+    index = DateRangeIndex(build_daily_cube(base))
+
+    with_first = index.extended(build_daily_cube(first))
+    with_second = index.extended(build_daily_cube(second))
+    start, end = reviews['at'].min().date(), reviews['at'].max().date()
+    for extended, parts in ((index, [base]), (with_first, [base, first]), (with_second, [base, second])):
+        expected = _pivot(pd.concat(parts), start, end)
+        pd.testing.assert_frame_equal(extended.query(start, end), expected, check_dtype=False, check_names=False)
+
+
+def _reviews():
+    reviews = generate_reviews(6_000, n_apps=5, n_clusters=6, n_versions=4, n_days=60, seed=1)
+    return reviews.sort_values('at', ignore_index=True)
+
+
+@pytest.mark.parametrize('window', ['all', 'first day', 'last day', 'middle week', 'before', 'after', 'reversed'])
+def test_date_index_query_matches_a_pivot_of_the_rows(window):
+    reviews = _reviews()
+    first, last = reviews['at'].min().date(), reviews['at'].max().date()
+    start, end = {
+        'all': (first, last),
+        'first day': (first, first),
+        'last day': (last, last),
+        'middle week': (first + pd.Timedelta(days=20), first + pd.Timedelta(days=26)),
+        'before': (first - pd.Timedelta(days=9), first - pd.Timedelta(days=1)),
+        'after': (last + pd.Timedelta(days=1), last + pd.Timedelta(days=9)),
+        'reversed': (last, first),
+    }[window]
+    table = DateRangeIndex(build_daily_cube(reviews)).query(start, end)
+
+    expected = _pivot(reviews, start, end)
+    if expected.empty:
+        assert table.empty
+    else:
+        pd.testing.assert_frame_equal(table, expected, check_dtype=False, check_names=False)
+
+
+def test_date_index_query_keeps_only_the_selected_known_keys():
+    reviews = _reviews()
+    start, end = reviews['at'].min().date(), reviews['at'].max().date()
+    index = DateRangeIndex(build_daily_cube(reviews))
+
+    table = index.query(start, end, apps=['App 001', 'no such app'], clusters=['cluster 002', 'cluster 000', 'nope'])
+    expected = _pivot(reviews, start, end).loc[['App 001'], ['cluster 000', 'cluster 002']]
+    pd.testing.assert_frame_equal(table, expected, check_dtype=False, check_names=False)
+    assert index.query(start, end, apps=['no such app']).empty
+    assert index.query(start, end, apps=[]).empty
+
+
+def _bucket_groupby(reviews, bucket):
+    at = reviews['at']
+    starts = {'day': at.dt.floor('D'), 'week': at.dt.to_period('W-SUN').dt.start_time,
+              'month': at.dt.to_period('M').dt.start_time}[bucket]
+    sums = reviews.groupby([starts.rename('at'), reviews['kmeans_cluster_name'].astype(str)])
+    return sums['thumbsUpCount_222'].sum().reset_index()
+
+
+@pytest.mark.parametrize('bucket', TIME_BUCKETS)
+def test_time_bucket_sums_match_a_groupby(bucket):
+    reviews = _reviews()
+    # Rows without a cluster are left out, as by groupby
+    reviews['kmeans_cluster_name'] = reviews['kmeans_cluster_name'].where(reviews.index % 50 != 0)
+    expected = _bucket_groupby(reviews, bucket)
+
+    for source in (reviews, build_daily_cube(reviews)):
+        sums = time_bucket_sums(source, buckets=[bucket])[bucket]
+        sums['kmeans_cluster_name'] = sums['kmeans_cluster_name'].astype(str)
+        pd.testing.assert_frame_equal(sums, expected, check_dtype=False)
+
+
+def test_time_bucket_sums_of_no_rows_are_empty():
+    sums = time_bucket_sums(_reviews().iloc[:0])
+    assert set(sums) == set(TIME_BUCKETS)
+    assert all(frame.empty for frame in sums.values())
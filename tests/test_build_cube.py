@@ -0,0 +1,30 @@
+import pandas as pd
+
+import data_store
+from aggregates import CUBE_KEYS, build_daily_cube
+from benchmarks.synthetic import generate_reviews
+from build_cube import build_cube
+
+
+def _cells(cube):
+    cells = cube[CUBE_KEYS + ['thumbsUpCount_222', 'n_reviews']].astype({
+        column: str for column in data_store.CATEGORICAL_COLUMNS
+    })
+    return cells.sort_values(CUBE_KEYS, ignore_index=True)
+
+
+def test_chunked_cube_matches_the_cube_of_the_whole_export(tmp_path):
+    # 120 days from January: local times cross the switch from -05:00 to -04:00
+    reviews = generate_reviews(5_000, n_apps=4, n_clusters=5, n_versions=6, n_days=120, seed=4)
+    local = reviews['at'].dt.tz_localize('UTC').dt.tz_convert('America/New_York')
+    offsets = local.dt.strftime('%z').str.replace(r'(\d\d)$', r':\1', regex=True)
+    export = reviews.assign(at=local.dt.strftime('%Y-%m-%d %H:%M:%S ') + offsets)
+    assert export['at'].str.endswith('-05:00').any() and export['at'].str.endswith('-04:00').any()
+    path = str(tmp_path / 'reviews.csv')
+    export.to_csv(path, index=False)
+
+    cube, report = build_cube(path, chunk_rows=700, workers=2)
+    assert report['rows_read'] == report['rows_kept'] == 5_000
+
+    expected = build_daily_cube(data_store.prepare_reviews(reviews.assign(at=reviews['at'].dt.tz_localize('UTC')))[0])
+    pd.testing.assert_frame_equal(_cells(cube), _cells(expected), check_dtype=False)
@@ -0,0 +1,134 @@
+import os
+
+import pandas as pd
+import pytest
+
+import data_store
+from aggregates import CUBE_KEYS, build_daily_cube
+from benchmarks.synthetic import generate_reviews
+
+
+def _sorted_cells(cube):
+    cells = cube[CUBE_KEYS + ['thumbsUpCount_222', 'n_reviews']].astype({
+        column: str for column in data_store.CATEGORICAL_COLUMNS
+    })
+    return cells.sort_values(CUBE_KEYS, ignore_index=True)
+
+
+def test_delta_after_prepared_load_matches_full_rebuild(tmp_path):
+    reviews = generate_reviews(5_000, n_apps=4, n_clusters=5, n_versions=6, n_days=60)
+    cutoff = reviews['at'].quantile(0.9)
+    base, late = reviews[reviews['at'] < cutoff], reviews[reviews['at'] >= cutoff]
+    # The delta also touches some of the later days the base already has
+    recent = base[base['at'] >= reviews['at'].quantile(0.7)]
+    delta = pd.concat([late, recent.sample(200, random_state=0)], ignore_index=True)
+    path = str(tmp_path / 'reviews.pkl')
+    base.to_pickle(path)
+
+    first = data_store.DataStore(path).get()
+    directory = data_store.prepared_dir_for(path)
+    assert data_store.current_snapshot(directory) == first.version
+    # One cube, in App order, which the partitions slice without copying
+    assert first.partitions.rows_by_app is first.cube
+    assert first.cube['App'].astype(str).is_monotonic_increasing
+
+    # A new process starts from the prepared artifact, then merges the delta
+    store = data_store.DataStore(path)
+    loaded = store.get()
+    assert loaded.version == first.version
+    # Its cube is used in place from the mapped files rather than copied into the process
+    assert loaded.partitions.rows_by_app is loaded.cube
+    assert loaded.mapped_bytes > 0 and loaded.memory_bytes < first.memory_bytes / 2
+    pd.testing.assert_frame_equal(loaded.cube, first.cube)
+    data_store.append_reviews(delta, path)
+    dataset = store.get()
+
+    assert len(dataset.deltas) == 1
+    assert not dataset.cube.duplicated(CUBE_KEYS).any()
+    expected = build_daily_cube(data_store.compact_reviews(pd.concat([base, delta], ignore_index=True)))
+    pd.testing.assert_frame_equal(_sorted_cells(dataset.cube), _sorted_cells(expected), check_dtype=False)
+
+
+def test_pickle_and_feather_of_a_dataset_are_prepared_separately(tmp_path):
+    reviews = generate_reviews(1_000, n_apps=3, n_clusters=4, n_versions=5, n_days=30)
+    pickle_path, feather_path = str(tmp_path / 'reviews.pkl'), str(tmp_path / 'reviews.feather')
+    reviews.to_pickle(pickle_path)
+    data_store.write_columnar(reviews.iloc[:500], feather_path)
+
+    assert data_store.prepared_dir_for(pickle_path) != data_store.prepared_dir_for(feather_path)
+    assert data_store.DataStore(pickle_path).get().cube['n_reviews'].sum() == 1_000
+    assert data_store.DataStore(feather_path).get().cube['n_reviews'].sum() == 500
+
+
+def _app_sums(rows):
+    return rows.groupby(['kmeans_cluster_name', 'appVersion'], observed=True)['thumbsUpCount_222'].sum()
+
+
+def test_small_deltas_are_layered_then_compacted_and_saved(tmp_path, monkeypatch):
+    reviews = generate_reviews(8_000, n_apps=4, n_clusters=5, n_versions=6, n_days=90)
+    reviews = reviews.sort_values('at', ignore_index=True)
+    base, batches = reviews.iloc[:6_000], [reviews.iloc[start:start + 100] for start in range(6_000, 8_000, 100)]
+    path = str(tmp_path / 'reviews.pkl')
+    base.to_pickle(path)
+    store = data_store.DataStore(path)
+    store.get()
+
+    data_store.append_reviews(batches[0].assign(App='New App'), path)
+    layered = store.get()
+    assert layered.pending_deltas == 1
+    assert 'New App' in layered.vocabularies['App']
+    assert layered.n_cells > len(layered.partitions.rows('App 000')) > 0
+
+    for batch in batches[1:]:
+        data_store.append_reviews(batch, path)
+        dataset = store.get()
+        if dataset.pending_deltas == 0:
+            break
+    assert dataset.pending_deltas == 0 and len(dataset.deltas) > 1
+    merged = pd.concat([base, batches[0].assign(App='New App')] + batches[1:len(dataset.deltas)], ignore_index=True)
+    expected = build_daily_cube(data_store.compact_reviews(merged))
+    pd.testing.assert_frame_equal(_sorted_cells(dataset.cube), _sorted_cells(expected), check_dtype=False)
+
+    # Layered rows sum to the same as the merged cube's
+    pd.testing.assert_series_equal(_app_sums(layered.partitions.rows('App 000')),
+                                   _app_sums(layered.cube[layered.cube['App'] == 'App 000']))
+
+    # A new process starts from the saved merge instead of replaying the deltas
+    with monkeypatch.context() as patched:
+        patched.setattr(data_store, 'read_reviews', None)
+        restarted = data_store.DataStore(path).get()
+    assert restarted.version == dataset.version and restarted.deltas == dataset.deltas
+
+    # Removing a delta the saved merge holds falls back to the base file
+    os.remove(os.path.join(data_store.delta_dir_for(path), dataset.deltas[0]))
+    rebuilt = data_store.DataStore(path).get()
+    assert rebuilt.deltas == dataset.deltas[1:]
+    assert 'New App' not in rebuilt.vocabularies['App']
+
+
+def test_timestamps_with_mixed_utc_offsets_are_parsed_in_utc():
+    reviews = pd.DataFrame({
+        'App': ['a', 'a', 'b'],
+        'kmeans_cluster_name': ['c', 'c', 'c'],
+        'thumbsUpCount_222': [1, 2, 3],
+        # Across the US DST change, and one unparseable value
+        'at': ['2024-03-09 23:30:00 -05:00', '2024-03-11 10:00:00 -04:00', 'not a date'],
+        'appVersion': ['1.0', '1.0', '1.1'],
+    })
+    cleaned, report = data_store.prepare_reviews(reviews)
+    assert report['dropped'] == {'at': 1}
+    assert list(cleaned['at']) == [pd.Timestamp('2024-03-10 04:30', tz='UTC'),
+                                   pd.Timestamp('2024-03-11 14:00', tz='UTC')]
+    assert data_store.compact_reviews(reviews)['at'].isna().sum() == 1
+
+
+def test_append_reviews_validates_the_batch(tmp_path):
+    path = str(tmp_path / 'reviews.pkl')
+    reviews = generate_reviews(100, n_apps=2, n_clusters=2, n_versions=2, n_days=5)
+    with pytest.raises(data_store.DatasetError):
+        data_store.append_reviews(reviews.drop(columns='App'), path)
+    assert not os.path.exists(data_store.delta_dir_for(path))
+
+    reviews['at'] = reviews['at'].astype(str).where(reviews.index % 10 != 0, 'not a date')
+    written = pd.read_feather(data_store.append_reviews(reviews, path))
+    assert len(written) == 90 and written['at'].notna().all()
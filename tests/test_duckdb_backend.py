@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_store
+from aggregates import CUBE_KEYS
+from benchmarks.synthetic import generate_reviews
+
+pytest.importorskip('duckdb')
+
+
+@pytest.mark.parametrize('thumbs', ['int', 'whole float', 'fractional', 'missing', 'text'])
+def test_duckdb_cube_matches_pandas_cube(tmp_path, thumbs):
+    reviews = generate_reviews(3_000, n_apps=5, n_clusters=6, n_versions=8, n_days=60)
+    values = reviews['thumbsUpCount_222']
+    if thumbs == 'whole float':
+        reviews['thumbsUpCount_222'] = values.astype(np.float64)
+    elif thumbs == 'fractional':
+        reviews['thumbsUpCount_222'] = values + 0.5
+    elif thumbs == 'missing':
+        reviews['thumbsUpCount_222'] = values.astype(np.float64).where(values % 7 != 0)
+    elif thumbs == 'text':
+        reviews['thumbsUpCount_222'] = values.astype(str).where(values % 7 != 0, 'n/a')
+    path = str(tmp_path / 'reviews.feather')
+    data_store.write_columnar(reviews, path)
+
+    by_pandas = data_store.read_daily_cube(path, 'pandas').sort_values(CUBE_KEYS, ignore_index=True)
+    by_duckdb = data_store.read_daily_cube(path, 'duckdb').sort_values(CUBE_KEYS, ignore_index=True)
+    pd.testing.assert_frame_equal(by_duckdb, by_pandas)
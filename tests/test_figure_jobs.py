@@ -0,0 +1,25 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from figure_jobs import once
+
+
+def test_once_runs_a_shared_input_a_single_time_for_concurrent_builds():
+    calls = []
+    started = threading.Barrier(4)
+
+    @once
+    def shared():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    def build():
+        started.wait()
+        return shared()
+
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda _: build(), range(4)))
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import build_daily_cube
+from benchmarks.synthetic import generate_reviews
+from pivots import VIEWS, PivotMatrix
+
+
+def _reviews(seed=1):
+    reviews = generate_reviews(4_000, n_apps=6, n_clusters=5, n_versions=4, n_days=40, seed=seed)
+    for column in ['App', 'kmeans_cluster_name']:
+        reviews[column] = reviews[column].astype(str)
+    return reviews
+
+
+def _groupby(reviews):
+    table = reviews.groupby(['App', 'kmeans_cluster_name'])['thumbsUpCount_222'].sum().unstack(fill_value=0)
+    return table.rename_axis(index='App', columns='kmeans_cluster_name')
+
+
+def _percentages(table, axis):
+    totals = table.sum(axis=axis)
+    shares = table.div(totals.where(totals != 0), axis=1 - axis) * 100
+    return shares.fillna(0.0)
+
+
+def test_from_frame_matches_a_groupby_pivot():
+    reviews = _reviews()
+    # Rows missing a key are ignored, as by groupby
+    reviews.loc[reviews.index % 40 == 0, 'App'] = None
+    expected = _groupby(reviews)
+
+    for source in (reviews, build_daily_cube(reviews)):
+        matrix = PivotMatrix.from_frame(source)
+        pd.testing.assert_frame_equal(matrix.raw(), expected, check_dtype=False, check_names=False)
+
+
+def test_percentage_views_match_pandas_and_treat_empty_rows_as_zero():
+    table = _groupby(_reviews())
+    table.loc['App 999'] = 0
+    matrix = PivotMatrix.from_table(table)
+
+    row_pct = _percentages(table, axis=1)
+    swot = _percentages(row_pct, axis=0)
+    pd.testing.assert_frame_equal(matrix.row_pct(), row_pct)
+    pd.testing.assert_frame_equal(matrix.swot(), swot)
+    pd.testing.assert_frame_equal(matrix.strength(), _percentages(swot, axis=1))
+    assert (matrix.row_pct().loc['App 999'] == 0).all()
+
+
+@pytest.mark.parametrize('view', VIEWS)
+def test_delta_aligns_rows_and_columns_missing_on_either_side(view):
+    before = _groupby(_reviews(seed=1)).drop(index='App 000', columns='cluster 001')
+    after = _groupby(_reviews(seed=2)).drop(index='App 005')
+    index, columns = before.index.union(after.index), before.columns.union(after.columns)
+
+    def in_view(table):
+        table = table.reindex(index=index, columns=columns, fill_value=0)
+        return getattr(PivotMatrix.from_table(table), view)()
+
+    delta = PivotMatrix.from_table(before).delta(PivotMatrix.from_table(after), view)
+    pd.testing.assert_frame_equal(delta, in_view(after) - in_view(before), check_dtype=False)
+
+
+def test_from_frame_of_no_rows_is_empty():
+    matrix = PivotMatrix.from_frame(_reviews().iloc[:0])
+    assert matrix.values.shape == (0, 0)
+    assert np.array_equal(matrix.row_pct().to_numpy(), np.zeros((0, 0)))
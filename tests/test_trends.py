@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from aggregates import DateRangeIndex, build_daily_cube
+from trends import pair_trends
+
+
+def _daily_reviews(thumbs_per_day, app='App', cluster='cluster'):
+    days = pd.date_range('2024-01-01', periods=len(thumbs_per_day), freq='D')
+    return pd.DataFrame({
+        'at': days,
+        'App': app,
+        'appVersion': '1.0',
+        'kmeans_cluster_name': cluster,
+        'thumbsUpCount_222': np.asarray(thumbs_per_day, dtype=np.int64),
+    })
+
+
+def _trends(reviews):
+    return pair_trends(DateRangeIndex(build_daily_cube(reviews))).set_index('App')
+
+
+def test_a_spike_after_a_flat_baseline_is_scored_against_the_spread_floor():
+    # 12 identical weeks (std 0), then a week of ten times as many thumbs
+    trends = _trends(_daily_reviews([1] * 84 + [10] * 7)).loc['App']
+    assert trends['baseline_mean'] == 7 and trends['baseline_std'] == 0
+    assert trends['last_7d'] == 70 and trends['wow_delta'] == 63
+    assert np.isclose(trends['z_score'], (70 - 7) / np.sqrt(7 + 1))
+
+
+def test_fewer_than_two_baseline_weeks_leave_the_z_score_nan():
+    short = _trends(_daily_reviews([1] * 20)).loc['App']
+    assert np.isnan(short['z_score']) and np.isnan(short['baseline_mean'])
+    assert short['last_7d'] == 7
+
+    two_weeks = _trends(_daily_reviews([1] * 21)).loc['App']
+    assert np.isclose(two_weeks['z_score'], 0)
@@ -0,0 +1,14 @@
+from versions import version_key
+
+
+def test_version_key_compares_numeric_parts_as_numbers():
+    assert version_key('1.10') > version_key('1.9')
+    assert version_key('10.0') > version_key('9.1')
+    assert version_key('1.9.1') > version_key('1.9')
+    assert version_key('v2.1') == version_key('2.1')
+
+
+def test_version_key_orders_text_parts_after_numbers():
+    versions = ['Varies with device', '1.10', '1.9b', 'beta', '1.9', 'v1.9A', '1.9.0', '2']
+    assert sorted(versions, key=version_key) == ['1.9', '1.9.0', 'v1.9A', '1.9b', '1.10', '2', 'beta',
+                                                 'Varies with device']
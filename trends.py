@@ -0,0 +1,131 @@
+"""
+Rolling trends and spike detection for every (App, kmeans_cluster_name) series at once (Tab 7).
+
+Every figure here is a window sum, and the DateRangeIndex prefix sums give
+the sum of any window for all pairs as one row difference:
+sum of days [s, e] = cum_sums[e + 1] - cum_sums[s]. So the 7/28-day sums,
+the week-over-week change and the weekly baseline of every pair come from a
+few dozen rows of the index, whatever the number of Apps, clusters or days.
+"""
+import numpy as np
+import pandas as pd
+
+import profiling
+
+SHORT_WINDOW = 7
+LONG_WINDOW = 28
+
+# Weeks before the current one that a pair's spike z-score is measured against
+BASELINE_WEEKS = 12
+
+# Column of pair_trends() -> label, for ranking controls and table headers
+RANKINGS = {
+    'z_score': "Spike z-score",
+    'wow_delta': "Week-over-week change",
+    'last_7d': "Last 7 days",
+    'last_28d': "Last 28 days",
+}
+
+
+@profiling.timed('aggregate')
+def pair_trends(date_index, end_date=None, baseline_weeks=BASELINE_WEEKS):
+    """
+    One row per (App, kmeans_cluster_name) pair, as of `end_date` (default: the last day):
+    - last_7d / last_28d: thumbsUpCount_222 over the 7 / 28 days ending on `end_date`
+    - prev_7d: the 7 days before those; wow_delta = last_7d - prev_7d, wow_pct relative to prev_7d
+    - baseline_mean / baseline_std: weekly sums of the `baseline_weeks` weeks before last_7d
+      (only weeks fully within the data; fewer than two leave the z-score NaN)
+    - z_score: how many baseline standard deviations last_7d is above the baseline mean,
+      with the deviation at least sqrt(baseline_mean + 1), so flat baselines still score
+    Pairs without any reviews in the last 28 days or the baseline are left out.
+    """
+    cum = date_index.sums_at
+    last = date_index.n_days - 1 if end_date is None else date_index.day_offset(end_date)
+    end = min(max(last, -1), date_index.n_days - 1) + 1
+
+    def window(stop, days):
+        # Sum over the `days` days before prefix row `stop`, for every pair
+        return cum(max(stop, 0)) - cum(min(max(stop - days, 0), date_index.n_days))
+
+    last_7d = window(end, SHORT_WINDOW)
+    prev_7d = window(end - SHORT_WINDOW, SHORT_WINDOW)
+    last_28d = window(end, LONG_WINDOW)
+
+    n_weeks = min(baseline_weeks, max(end - SHORT_WINDOW, 0) // SHORT_WINDOW)
+    bounds = end - SHORT_WINDOW * np.arange(1, n_weeks + 2)
+    weekly = (cum(bounds[:-1]) - cum(bounds[1:])).astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if n_weeks >= 2:
+            baseline_mean = weekly.mean(axis=0)
+            baseline_std = weekly.std(axis=0, ddof=1)
+            # Weekly sums are counts: the spread is floored at the Poisson sqrt(mean + 1), so a
+            # flat baseline followed by a spike scores high instead of dividing by zero
+            spread = np.maximum(baseline_std, np.sqrt(np.maximum(baseline_mean, 0) + 1))
+            z_score = (last_7d - baseline_mean) / spread
+        else:
+            baseline_mean = baseline_std = z_score = np.full(len(date_index.pair_app_codes), np.nan)
+        wow_pct = np.where(prev_7d != 0, (last_7d - prev_7d) / prev_7d * 100, np.nan)
+
+    active = (last_28d != 0) | (weekly != 0).any(axis=0)
+    columns = {
+        'last_7d': last_7d,
+        'prev_7d': prev_7d,
+        'wow_delta': last_7d - prev_7d,
+        'wow_pct': wow_pct,
+        'last_28d': last_28d,
+        'baseline_mean': baseline_mean,
+        'baseline_std': baseline_std,
+        'z_score': z_score,
+    }
+    return _trend_frame(date_index, np.flatnonzero(active), columns)
+
+
+def top_movers(trends, by='z_score', n=20):
+    """
+    The `n` rows of pair_trends() that moved most by `by`, up or down
+    (largest absolute value first; NaN last).
+    """
+    order = np.argsort(-np.nan_to_num(np.abs(trends[by].to_numpy(dtype=np.float64)), nan=-1.0), kind='stable')
+    return trends.iloc[order[:n]].reset_index(drop=True)
+
+
+@profiling.timed('aggregate')
+def rolling_sums(date_index, pairs, window=SHORT_WINDOW):
+    """
+    Daily series of the trailing `window`-day thumbsUpCount_222 sum for each
+    (App, kmeans_cluster_name) in `pairs`, as a long frame (at, App,
+    kmeans_cluster_name, thumbsUpCount_222). Computed from the prefix sums
+    of just those pairs' columns.
+    """
+    positions = _pair_positions(date_index, pairs)
+    cum = date_index.sum_columns(positions)
+    stops = np.arange(1, len(cum))
+    starts = np.maximum(stops - window, 0)
+    sums = cum[stops] - cum[starts]
+
+    days = (date_index.first_day + np.arange(len(stops))).astype('datetime64[D]')
+    return pd.DataFrame({
+        'at': np.tile(days, len(positions)).astype('datetime64[ns]'),
+        'App': np.repeat([app for app, _ in pairs], len(stops)),
+        'kmeans_cluster_name': np.repeat([cluster for _, cluster in pairs], len(stops)),
+        'thumbsUpCount_222': sums.T.ravel(),
+    })
+
+
+def _pair_positions(date_index, pairs):
+    app_codes = {app: code for code, app in enumerate(date_index.apps)}
+    cluster_codes = {cluster: code for code, cluster in enumerate(date_index.clusters)}
+    keys = date_index.pair_app_codes * len(date_index.clusters) + date_index.pair_cluster_codes
+    wanted = np.array([app_codes[app] * len(date_index.clusters) + cluster_codes[cluster]
+                       for app, cluster in pairs], dtype=np.int64)
+    return np.searchsorted(keys, wanted)
+
+
+def _trend_frame(date_index, positions, columns):
+    frame = pd.DataFrame({
+        'App': [date_index.apps[c] for c in date_index.pair_app_codes[positions]],
+        'kmeans_cluster_name': [date_index.clusters[c] for c in date_index.pair_cluster_codes[positions]],
+    })
+    for name, values in columns.items():
+        frame[name] = values[positions]
+    return frame
@@ -0,0 +1,87 @@
+"""
+Semantic ordering and bucketing of appVersion strings for Tab 6.
+
+appVersion is free text ("10.2.1", "9.1", "v3.0-beta", "Varies with device"),
+so sorting it as strings puts "10.0" before "9.1". version_key() splits a
+version into its numeric and text parts and compares the numbers as numbers.
+Versions can also be collapsed to their minor ("10.2.x") or major ("10.x")
+release before pivoting, which keeps heatmaps small for long release histories.
+"""
+import functools
+import re
+
+import numpy as np
+import pandas as pd
+
+from pivots import PivotMatrix
+
+# Grouping levels offered in Tab 6: every version, x.y releases, x releases
+LEVELS = ('version', 'minor', 'major')
+
+_PARTS = re.compile(r'\d+|[^\W\d_]+')
+
+
+@functools.lru_cache(maxsize=65536)
+def version_key(version):
+    """
+    Sort key for a version string:
+    - numeric parts compare as numbers ("9.1" < "10.0"), text parts case-insensitively
+    - a leading "v" is ignored ("v2.1" sorts with "2.1")
+    - versions that do not start with a number sort after all numbered ones
+    """
+    text = str(version).strip()
+    parts = _PARTS.findall(text[1:] if text[:1] in ('v', 'V') else text)
+    if not parts or not parts[0].isdigit():
+        return (1, (text.lower(),))
+    return (0, tuple((0, int(part), '') if part.isdigit() else (1, 0, part.lower()) for part in parts))
+
+
+def version_bucket(version, level):
+    """
+    Label of the `level` bucket `version` belongs to: the version itself,
+    "major.minor.x" or "major.x". Missing minor numbers count as 0; versions
+    without a leading number are their own bucket.
+    """
+    if level == 'version':
+        return version
+    if level not in LEVELS:
+        raise ValueError(f"unknown version level {level!r}, expected one of {LEVELS}")
+    kind, parts = version_key(version)
+    if kind != 0:
+        return version
+    numbers = []
+    for part in parts:
+        if part[0] != 0:
+            break
+        numbers.append(part[1])
+    if level == 'major':
+        return f"{numbers[0]}.x"
+    return f"{numbers[0]}.{numbers[1] if len(numbers) > 1 else 0}.x"
+
+
+def version_labels(versions, level='version', version_range=None):
+    """
+    Sorted distinct `level` buckets of `versions`, limited to `version_range`
+    (inclusive (low, high) bucket labels) when given.
+    """
+    labels = sorted({version_bucket(v, level) for v in versions if not pd.isna(v)}, key=version_key)
+    if version_range is None:
+        return labels
+    low, high = (version_key(bound) for bound in version_range)
+    return [label for label in labels if low <= version_key(label) <= high]
+
+
+def bucket_versions(matrix, level='version', version_range=None):
+    """
+    PivotMatrix with appVersion rows -> rows merged into `level` buckets,
+    restricted to `version_range` and sorted semantically.
+    """
+    labels = [version_bucket(v, level) for v in matrix.index]
+    buckets = version_labels(labels, version_range=version_range)
+    position = {bucket: i for i, bucket in enumerate(buckets)}
+    codes = np.array([position.get(label, -1) for label in labels], dtype=np.int64)
+    keep = codes >= 0
+
+    values = np.zeros((len(buckets), matrix.values.shape[1]), dtype=matrix.values.dtype)
+    np.add.at(values, codes[keep], matrix.values[keep])
+    return PivotMatrix(values, pd.Index(buckets, name=matrix.index.name), matrix.columns)